@@ -10,22 +10,30 @@ Luego acceder desde otra PC usando:
     http://<IP-DE-ESTE-PC>:8000/api/ping/{ip} para obtener datos de ping
 
 Instalar dependencias:
-    pip install fastapi uvicorn python-multipart
+    pip install fastapi "uvicorn[standard]" python-multipart orjson
 """
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse, Response
+from typing import Dict, Iterator, List, Optional, Set
 from datetime import datetime, timedelta
+from contextlib import contextmanager
+from functools import lru_cache
+from queue import Queue, Empty
 import sqlite3
+import io
 import os
+import time
 from pathlib import Path
 import uvicorn
+import orjson
 
 app = FastAPI(
     title="Ping Monitor API",
     description="API para acceder a datos de monitoreo de ping almacenados en SQLite",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse  # Serialización JSON en C (orjson)
 )
 
 # Configurar CORS para permitir acceso desde cualquier origen
@@ -39,6 +47,35 @@ app.add_middleware(
 
 PINGS_DIR = Path("pings")
 
+# Pool de conexiones de solo lectura por IP: se reutilizan entre peticiones
+# para conservar la caché de páginas en lugar de reabrir la BD cada vez
+_pool_conexiones: Dict[str, "Queue[sqlite3.Connection]"] = {}
+
+# id() de las conexiones abiertas sobre una base de datos de esquema v0 (ver
+# get_db_connection): se cierran al liberarlas en lugar de volver al pool
+_conexiones_esquema_v0: Set[int] = set()
+
+# Filas leídas por cada fetchmany() al generar respuestas grandes
+TAMANO_LOTE_FILAS = 1024
+
+# Segundos que se cachea el resultado de /api/ips
+LIST_IPS_TTL = 5
+
+# Segundos que se cachea el resultado de /api/stats/{ip}
+STATS_TTL = 5
+
+# SQLite permite adjuntar como máximo 10 bases de datos por conexión
+MAX_BD_ADJUNTAS = 10
+
+# Columnas de una fila de ping tal como las devuelve la API: la latencia se guarda
+# en microsegundos (NULL = timeout) y se expone en ms con -1 para timeouts
+_COLUMNAS_PING = "id, timestamp, COALESCE(tiempo_us / 1000.0, -1) AS tiempo_ms"
+
+_SQL_RESUMEN_IP = """
+    SELECT ? AS ip, COUNT(*) AS total, MIN(timestamp) AS first, MAX(timestamp) AS last
+    FROM {alias}.pings
+"""
+
 
 def get_available_ips() -> List[str]:
     """
@@ -64,6 +101,9 @@ def get_db_connection(ip: str) -> sqlite3.Connection:
     """
     Obtiene conexión a la base de datos de una IP específica.
 
+    Reutiliza una conexión del pool si hay alguna libre; si no, abre una nueva.
+    Devolverla con release_db_connection() (o usar db_connection()).
+
     Args:
         ip: Dirección IP
 
@@ -78,13 +118,171 @@ def get_db_connection(ip: str) -> sqlite3.Connection:
     if not db_path.exists():
         raise HTTPException(status_code=404, detail=f"No se encontró base de datos para IP {ip}")
 
+    pool = _pool_conexiones.get(ip)
+    if pool is not None:
+        try:
+            return pool.get_nowait()
+        except Empty:
+            pass
+
     # Abrir en modo de solo lectura para evitar conflictos con el proceso que escribe
     # y no requerir permisos de escritura (importante para bases de datos en modo WAL)
-    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn = sqlite3.connect(
+        f"file:{db_path}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        cached_statements=256
+    )
     conn.row_factory = sqlite3.Row  # Permite acceso por nombre de columna
+
+    # Bases de datos con el esquema v0 (tiempo_ms REAL, -1 = timeout) que el
+    # grabador todavía no migró: la API no escribe ni migra (eso lo hace
+    # preparar_bd_sqlite). Una vista temporal presenta la tabla con la columna
+    # tiempo_us del esquema actual, sin tocar el archivo
+    if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+        columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(pings)")}
+        if "tiempo_ms" in columnas:
+            conn.execute("""
+                CREATE TEMP VIEW pings AS
+                    SELECT id, timestamp,
+                           CASE WHEN tiempo_ms = -1 THEN NULL
+                                ELSE CAST(ROUND(tiempo_ms * 1000) AS INTEGER) END AS tiempo_us
+                    FROM main.pings
+            """)
+            # La vista deja de servir cuando el grabador migra: no se reutiliza
+            _conexiones_esquema_v0.add(id(conn))
+
+    # Pragmas de lectura: caché de páginas de ~20MB y lectura vía mmap (256MB)
+    conn.executescript("""
+        PRAGMA query_only=1;
+        PRAGMA cache_size=-20000;
+        PRAGMA mmap_size=268435456;
+    """)
     return conn
 
 
+def release_db_connection(ip: str, conn: sqlite3.Connection):
+    """
+    Devuelve una conexión al pool de su IP para reutilizarla.
+
+    Args:
+        ip: Dirección IP
+        conn: Conexión obtenida con get_db_connection()
+    """
+    if id(conn) in _conexiones_esquema_v0:
+        _conexiones_esquema_v0.discard(id(conn))
+        conn.close()
+        return
+    _pool_conexiones.setdefault(ip, Queue()).put_nowait(conn)
+
+
+@contextmanager
+def db_connection(ip: str) -> Iterator[sqlite3.Connection]:
+    """
+    Context manager que toma una conexión del pool y la devuelve al salir.
+
+    Args:
+        ip: Dirección IP
+
+    Raises:
+        HTTPException: Si la base de datos no existe
+    """
+    conn = get_db_connection(ip)
+    try:
+        yield conn
+    finally:
+        release_db_connection(ip, conn)
+
+
+def _resumen_lote(conn: sqlite3.Connection, ips: List[str]) -> List[dict]:
+    """
+    Obtiene total de pings y primer/último timestamp de un lote de IPs.
+
+    Adjunta la base de datos de cada IP a la conexión dada y las consulta todas
+    con un único UNION ALL, en lugar de abrir una conexión por IP.
+
+    Args:
+        conn: Conexión (en memoria) a la que adjuntar las bases de datos
+        ips: Lote de IPs, como máximo MAX_BD_ADJUNTAS
+
+    Returns:
+        Lista con la información (o el error) de cada IP, en el mismo orden
+    """
+    adjuntas = []  # [(alias, ip), ...]
+    filas = {}
+    errores = {}
+
+    for idx, ip in enumerate(ips):
+        alias = f"ip_{idx}"
+        db_path = PINGS_DIR / ip / "datos.db"
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{db_path}?mode=ro",))
+            adjuntas.append((alias, ip))
+        except sqlite3.Error as e:
+            errores[ip] = str(e)
+
+    try:
+        if adjuntas:
+            query = " UNION ALL ".join(_SQL_RESUMEN_IP.format(alias=alias) for alias, _ in adjuntas)
+            for row in conn.execute(query, [ip for _, ip in adjuntas]):
+                filas[row["ip"]] = row
+    except sqlite3.Error:
+        # Alguna base de datos no es válida: consultar una por una para aislar el error
+        for alias, ip in adjuntas:
+            try:
+                filas[ip] = conn.execute(_SQL_RESUMEN_IP.format(alias=alias), (ip,)).fetchone()
+            except sqlite3.Error as e:
+                errores[ip] = str(e)
+    finally:
+        for alias, _ in adjuntas:
+            conn.execute(f"DETACH DATABASE {alias}")
+
+    result = []
+    for ip in ips:
+        if ip in filas:
+            row = filas[ip]
+            result.append({
+                "ip": ip,
+                "total_pings": row["total"],
+                "first_ping": row["first"],
+                "last_ping": row["last"]
+            })
+        else:
+            result.append({
+                "ip": ip,
+                "error": errores.get(ip, "Error desconocido")
+            })
+
+    return result
+
+
+@lru_cache(maxsize=1)
+def _resumen_ips(intervalo: int) -> List[dict]:
+    """
+    Obtiene la información básica de todas las IPs monitoreadas.
+
+    Args:
+        intervalo: Número de intervalo de LIST_IPS_TTL segundos; sirve como
+            clave de caché para que el resultado se recalcule al cambiar
+
+    Returns:
+        Lista con la información (o el error) de cada IP
+    """
+    ips = get_available_ips()
+
+    conn = sqlite3.connect(":memory:", uri=True)
+    conn.row_factory = sqlite3.Row
+
+    result = []
+    try:
+        for inicio in range(0, len(ips), MAX_BD_ADJUNTAS):
+            result.extend(_resumen_lote(conn, ips[inicio:inicio + MAX_BD_ADJUNTAS]))
+    finally:
+        conn.close()
+
+    return result
+
+
 @app.get("/")
 async def root():
     """Endpoint raíz con información de la API."""
@@ -105,37 +303,12 @@ async def list_ips():
     """
     Lista todas las IPs que tienen datos de monitoreo disponibles.
 
+    El resultado se cachea durante LIST_IPS_TTL segundos.
+
     Returns:
         Lista de IPs con información básica
     """
-    ips = get_available_ips()
-
-    result = []
-    for ip in ips:
-        try:
-            conn = get_db_connection(ip)
-            cursor = conn.cursor()
-
-            # Obtener estadísticas básicas
-            cursor.execute("SELECT COUNT(*) as total FROM pings")
-            total = cursor.fetchone()["total"]
-
-            cursor.execute("SELECT MIN(timestamp) as first, MAX(timestamp) as last FROM pings")
-            row = cursor.fetchone()
-
-            conn.close()
-
-            result.append({
-                "ip": ip,
-                "total_pings": total,
-                "first_ping": row["first"],
-                "last_ping": row["last"]
-            })
-        except Exception as e:
-            result.append({
-                "ip": ip,
-                "error": str(e)
-            })
+    result = _resumen_ips(int(time.time() // LIST_IPS_TTL))
 
     return {"ips": result, "total": len(result)}
 
@@ -167,139 +340,180 @@ async def get_pings(
     Returns:
         Datos de ping con metadatos
     """
-    conn = get_db_connection(ip)
-    cursor = conn.cursor()
-
-    # Construir query con filtros
-    query = "SELECT * FROM pings WHERE 1=1"
-    params = []
-
-    if from_date:
-        query += " AND timestamp >= ?"
-        params.append(from_date)
-
-    if to_date:
-        query += " AND timestamp <= ?"
-        params.append(to_date)
-
-    if min_latency is not None:
-        query += " AND tiempo_ms >= ?"
-        params.append(min_latency)
-
-    if max_latency is not None:
-        query += " AND tiempo_ms <= ?"
-        params.append(max_latency)
-
-    if only_failures:
-        query += " AND tiempo_ms = -1"
-
-    # Ordenar por timestamp descendente (más recientes primero)
-    query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
-
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-
-    # Obtener total de registros que coinciden con filtros (sin limit/offset)
-    count_query = query.split("ORDER BY")[0].replace("SELECT *", "SELECT COUNT(*) as total")
-    cursor.execute(count_query, params[:-2])  # Excluir limit y offset
-    total = cursor.fetchone()["total"]
-
-    conn.close()
-
-    # Convertir a lista de diccionarios
-    pings = []
-    for row in rows:
-        pings.append({
-            "id": row["id"],
-            "timestamp": row["timestamp"],
-            "tiempo_ms": row["tiempo_ms"],
-            "status": "timeout" if row["tiempo_ms"] == -1 else "success"
-        })
-
-    return {
-        "ip": ip,
-        "total_results": total,
-        "returned": len(pings),
-        "offset": offset,
-        "limit": limit,
-        "pings": pings
-    }
-
-
-@app.get("/api/stats/{ip}")
-async def get_stats(
+    with db_connection(ip) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Tuplas simples: más rápido que sqlite3.Row
+
+        # Construir filtros
+        where_sql = "1=1"
+        params = []
+
+        if from_date:
+            where_sql += " AND timestamp >= ?"
+            params.append(from_date)
+
+        if to_date:
+            where_sql += " AND timestamp <= ?"
+            params.append(to_date)
+
+        if min_latency is not None:
+            where_sql += " AND tiempo_us >= ?"
+            params.append(min_latency * 1000)
+
+        if max_latency is not None:
+            where_sql += " AND tiempo_us <= ?"
+            params.append(max_latency * 1000)
+
+        if only_failures:
+            where_sql += " AND tiempo_us IS NULL"
+
+        if not params and not only_failures:
+            # Sin filtros: los pings se insertan en orden cronológico, así que
+            # ORDER BY id DESC da el mismo orden recorriendo directamente la
+            # clave primaria (sin índice secundario ni ordenamiento)
+            cursor.execute("SELECT COUNT(*) FROM pings")
+            total = cursor.fetchone()[0]
+
+            cursor.execute(f"""
+                SELECT {_COLUMNAS_PING}
+                FROM pings
+                ORDER BY id DESC
+                LIMIT ? OFFSET ?
+            """, (limit, offset))
+            lote = cursor.fetchmany(TAMANO_LOTE_FILAS)
+        else:
+            # Ordenar por timestamp descendente (más recientes primero).
+            # COUNT(*) OVER () devuelve en cada fila el total que coincide con los
+            # filtros (sin limit/offset), evitando una segunda consulta
+            cursor.execute(f"""
+                SELECT {_COLUMNAS_PING}, COUNT(*) OVER () AS _total
+                FROM pings
+                WHERE {where_sql}
+                ORDER BY timestamp DESC
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset])
+
+            # Leer en lotes con fetchmany y serializar cada lote directamente a
+            # bytes: nunca se tienen en memoria todas las filas y todos los dicts
+            # a la vez (con limit alto el pico de memoria era ~2x el JSON final)
+            lote = cursor.fetchmany(TAMANO_LOTE_FILAS)
+
+            if lote:
+                total = lote[0][3]
+            else:
+                # Sin filas en esta página (offset fuera de rango): contar aparte
+                cursor.execute(f"SELECT COUNT(*) FROM pings WHERE {where_sql}", params)
+                total = cursor.fetchone()[0]
+
+        # Las filas se serializan primero para saber cuántas se envían realmente
+        filas = io.BytesIO()
+        devueltas = 0
+        while lote:
+            if devueltas:
+                filas.write(b",")
+            devueltas += len(lote)
+            # Filas como tuplas (id, timestamp, tiempo_ms, ...): acceso por posición.
+            # orjson serializa el lote como lista; se quitan los corchetes
+            filas.write(orjson.dumps([
+                {
+                    "id": r[0],
+                    "timestamp": r[1],
+                    "tiempo_ms": r[2],
+                    "status": "timeout" if r[2] == -1 else "success"
+                }
+                for r in lote
+            ])[1:-1])
+            lote = cursor.fetchmany(TAMANO_LOTE_FILAS)
+
+        # Cabecera con metadatos (sin la llave de cierre) y después las filas
+        buf = io.BytesIO()
+        buf.write(orjson.dumps({
+            "ip": ip,
+            "total_results": total,
+            "returned": devueltas,
+            "offset": offset,
+            "limit": limit
+        })[:-1])
+        buf.write(b',"pings":[')
+        buf.write(filas.getbuffer())
+        buf.write(b"]}")
+
+    return Response(content=buf.getvalue(), media_type="application/json")
+
+
+@lru_cache(maxsize=256)
+def _estadisticas_ip(
     ip: str,
-    from_date: Optional[str] = Query(None, description="Fecha inicio (YYYY-MM-DD HH:MM:SS)"),
-    to_date: Optional[str] = Query(None, description="Fecha fin (YYYY-MM-DD HH:MM:SS)")
-):
+    from_date: Optional[str],
+    to_date: Optional[str],
+    intervalo: int,
+    ultimo_id: Optional[int]
+) -> dict:
     """
-    Obtiene estadísticas de ping para una IP específica.
+    Calcula las estadísticas de ping de una IP (resultado cacheado).
 
     Args:
         ip: Dirección IP a consultar
         from_date: Fecha inicio para calcular estadísticas
         to_date: Fecha fin para calcular estadísticas
+        intervalo: Número de intervalo de STATS_TTL segundos; sirve como
+            clave de caché para que el resultado se recalcule al cambiar
+        ultimo_id: Id del último ping guardado (solo sin to_date); invalida
+            la caché en cuanto se insertan pings nuevos
 
     Returns:
         Estadísticas de ping (min, max, avg, pérdida de paquetes, etc.)
     """
-    conn = get_db_connection(ip)
-    cursor = conn.cursor()
-
-    # Construir query base
-    where_clauses = []
-    params = []
-
-    if from_date:
-        where_clauses.append("timestamp >= ?")
-        params.append(from_date)
-
-    if to_date:
-        where_clauses.append("timestamp <= ?")
-        params.append(to_date)
-
-    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
-
-    # Estadísticas generales
-    cursor.execute(f"""
-        SELECT
-            COUNT(*) as total_pings,
-            SUM(CASE WHEN tiempo_ms = -1 THEN 1 ELSE 0 END) as timeouts,
-            SUM(CASE WHEN tiempo_ms != -1 THEN 1 ELSE 0 END) as successful,
-            MIN(CASE WHEN tiempo_ms != -1 THEN tiempo_ms END) as min_latency,
-            MAX(CASE WHEN tiempo_ms != -1 THEN tiempo_ms END) as max_latency,
-            AVG(CASE WHEN tiempo_ms != -1 THEN tiempo_ms END) as avg_latency,
-            MIN(timestamp) as first_ping,
-            MAX(timestamp) as last_ping
-        FROM pings
-        WHERE {where_sql}
-    """, params)
-
-    stats = cursor.fetchone()
-
-    # Calcular percentiles (mediana, p95, p99)
-    cursor.execute(f"""
-        SELECT tiempo_ms
-        FROM pings
-        WHERE {where_sql} AND tiempo_ms != -1
-        ORDER BY tiempo_ms
-    """, params)
-
-    latencies = [row["tiempo_ms"] for row in cursor.fetchall()]
-
-    conn.close()
-
-    # Calcular percentiles
-    percentiles = {}
-    if latencies:
-        sorted_latencies = sorted(latencies)
-        n = len(sorted_latencies)
-        percentiles = {
-            "p50": sorted_latencies[int(n * 0.50)] if n > 0 else None,
-            "p95": sorted_latencies[int(n * 0.95)] if n > 0 else None,
-            "p99": sorted_latencies[int(n * 0.99)] if n > 0 else None
-        }
+    with db_connection(ip) as conn:
+        cursor = conn.cursor()
+
+        # Construir query base
+        where_clauses = []
+        params = []
+
+        if from_date:
+            where_clauses.append("timestamp >= ?")
+            params.append(from_date)
+
+        if to_date:
+            where_clauses.append("timestamp <= ?")
+            params.append(to_date)
+
+        where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+
+        # Estadísticas generales
+        cursor.execute(f"""
+            SELECT
+                COUNT(*) as total_pings,
+                COUNT(*) - COUNT(tiempo_us) as timeouts,
+                COUNT(tiempo_us) as successful,
+                MIN(tiempo_us) / 1000.0 as min_latency,
+                MAX(tiempo_us) / 1000.0 as max_latency,
+                AVG(tiempo_us) / 1000.0 as avg_latency,
+                MIN(timestamp) as first_ping,
+                MAX(timestamp) as last_ping
+            FROM pings
+            WHERE {where_sql}
+        """, params)
+
+        stats = cursor.fetchone()
+
+        # Calcular percentiles (mediana, p95, p99) en SQL: cada consulta recorre
+        # el índice idx_tiempo y devuelve una sola fila, sin traer todas las
+        # latencias a Python
+        percentiles = {}
+        n = stats["successful"] or 0
+        if n > 0:
+            for nombre, fraccion in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+                cursor.execute(f"""
+                    SELECT tiempo_us / 1000.0 AS tiempo_ms
+                    FROM pings
+                    WHERE {where_sql} AND tiempo_us IS NOT NULL
+                    ORDER BY tiempo_us
+                    LIMIT 1 OFFSET ?
+                """, params + [int(n * fraccion)])
+                row = cursor.fetchone()
+                percentiles[nombre] = row["tiempo_ms"] if row else None
 
     total = stats["total_pings"]
     packet_loss = (stats["timeouts"] / total * 100) if total > 0 else 0
@@ -325,6 +539,36 @@ async def get_stats(
     }
 
 
+
+@app.get("/api/stats/{ip}")
+async def get_stats(
+    ip: str,
+    from_date: Optional[str] = Query(None, description="Fecha inicio (YYYY-MM-DD HH:MM:SS)"),
+    to_date: Optional[str] = Query(None, description="Fecha fin (YYYY-MM-DD HH:MM:SS)")
+):
+    """
+    Obtiene estadísticas de ping para una IP específica.
+
+    El resultado se cachea durante STATS_TTL segundos. Si no se indica
+    to_date, la caché también se invalida cuando llegan pings nuevos.
+
+    Args:
+        ip: Dirección IP a consultar
+        from_date: Fecha inicio para calcular estadísticas
+        to_date: Fecha fin para calcular estadísticas
+
+    Returns:
+        Estadísticas de ping (min, max, avg, pérdida de paquetes, etc.)
+    """
+    ultimo_id = None
+    if to_date is None:
+        # MAX(id) se resuelve con la clave primaria, sin recorrer la tabla
+        with db_connection(ip) as conn:
+            ultimo_id = conn.execute("SELECT MAX(id) FROM pings").fetchone()[0]
+
+    return _estadisticas_ip(ip, from_date, to_date, int(time.time() // STATS_TTL), ultimo_id)
+
+
 @app.get("/api/recent/{ip}")
 async def get_recent_pings(
     ip: str,
@@ -345,26 +589,30 @@ async def get_recent_pings(
     from_time = now - timedelta(minutes=minutes)
     from_date = from_time.strftime("%Y-%m-%d %H:%M:%S")
 
-    conn = get_db_connection(ip)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT * FROM pings
-        WHERE timestamp >= ?
-        ORDER BY timestamp DESC
-    """, (from_date,))
-
-    rows = cursor.fetchall()
-    conn.close()
-
-    pings = []
-    for row in rows:
-        pings.append({
-            "id": row["id"],
-            "timestamp": row["timestamp"],
-            "tiempo_ms": row["tiempo_ms"],
-            "status": "timeout" if row["tiempo_ms"] == -1 else "success"
-        })
+    with db_connection(ip) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Tuplas simples: más rápido que sqlite3.Row
+
+        # Filtro por timestamp (no por id: no depende de que los ids sigan el
+        # orden cronológico). Se resuelve recorriendo hacia atrás el índice
+        # cubriente idx_ts_lat, sin leer la tabla ni ordenar en memoria
+        cursor.execute(f"""
+            SELECT {_COLUMNAS_PING} FROM pings
+            WHERE timestamp >= ?
+            ORDER BY timestamp DESC
+        """, (from_date,))
+        rows = cursor.fetchall()
+
+    # Filas como tuplas (id, timestamp, tiempo_ms, ...): acceso por posición
+    pings = [
+        {
+            "id": r[0],
+            "timestamp": r[1],
+            "tiempo_ms": r[2],
+            "status": "timeout" if r[2] == -1 else "success"
+        }
+        for r in rows
+    ]
 
     return {
         "ip": ip,
@@ -397,5 +645,17 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
 
-    # Iniciar servidor en 0.0.0.0 para que sea accesible desde la red
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Iniciar servidor en 0.0.0.0 para que sea accesible desde la red.
+    # Un worker por núcleo: cada proceso tiene su propio pool de conexiones de
+    # solo lectura (seguro con WAL). Con loop/http "auto" uvicorn usa uvloop y
+    # httptools si están instalados (uvicorn[standard], no disponible en Windows)
+    # y si no cae a asyncio/h11. Con workers hay que pasar la app como "modulo:app"
+    uvicorn.run(
+        "api:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=(os.cpu_count() or 2),
+        loop="auto",
+        http="auto",
+        access_log=False
+    )
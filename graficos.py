@@ -0,0 +1,26 @@
+"""
+graficos.py
+Configuración de pyqtgraph compartida por ping-grafico.py y visorIndividual.py
+"""
+
+import os
+
+
+def configurar_opengl():
+    """
+    Activa el renderizado OpenGL de pyqtgraph si USE_OPENGL=1 y PyOpenGL está
+    instalado. Llamar antes de crear la QApplication.
+
+    Es opcional (desactivado por defecto): el modo experimental de pyqtgraph
+    falla o es más lento en algunas GPUs y drivers. La variable se lee al
+    llamar, así que también vale si viene del .env cargado por el programa.
+    """
+    if os.getenv("USE_OPENGL", "0") != "1":
+        return
+    try:
+        import OpenGL  # noqa: F401
+    except ImportError:
+        return
+    import pyqtgraph as pg
+    pg.setConfigOption('useOpenGL', True)
+    pg.setConfigOption('enableExperimental', True)
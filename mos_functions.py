@@ -6,8 +6,10 @@ Funciones core para cálculo de MOS en VoIP
 import ping3
 import statistics
 from datetime import datetime
+from functools import lru_cache
 import time
 import os
+import re
 
 
 def hacer_ping(ip, cantidad=10):
@@ -22,6 +24,19 @@ def hacer_ping(ip, cantidad=10):
     Retorna:
     - nombre_archivo: Ruta del archivo creado o None si hay error
     """
+    return _medir_ping(ip, cantidad)[0]
+
+
+def _medir_ping(ip, cantidad):
+    """
+    Hace el trabajo de hacer_ping y además devuelve los datos medidos, para
+    que analizar_ip calcule las métricas sin releer el archivo.
+    
+    Retorna:
+    - tupla: (nombre_archivo, latencias, paquetes_enviados, paquetes_recibidos)
+      nombre_archivo es None si hay error o la conexión es inestable;
+      latencias es la lista de latencias válidas en ms
+    """
     # Crear carpeta pings si no existe
     if not os.path.exists('pings'):
         os.makedirs('pings')
@@ -29,14 +44,16 @@ def hacer_ping(ip, cantidad=10):
     fecha_hora = datetime.now().strftime("%Y%m%d-%H%M%S")
     nombre_archivo = f"pings/ping-{ip}-{fecha_hora}.txt"
     
+    latencias = []
+    paquetes_enviados = 0
+    paquetes_recibidos = 0
+    
     try:
-        latencias = []
-        paquetes_enviados = 0
-        paquetes_recibidos = 0
-        
-        # Realizar pings con intervalo de 1 segundo
+        # Realizar pings con intervalo de 1 segundo, programados contra un
+        # deadline absoluto con reloj monotónico para no acumular desfase
+        proximo_tick = time.monotonic()
         for i in range(cantidad):
-            inicio = time.time()
+            proximo_tick += 1.0
             paquetes_enviados += 1
             
             try:
@@ -52,10 +69,10 @@ def hacer_ping(ip, cantidad=10):
             except Exception:
                 pass  # Paquete perdido
             
-            # Esperar para completar 1 segundo total
-            tiempo_transcurrido = time.time() - inicio
-            if tiempo_transcurrido < 1.0:
-                time.sleep(1.0 - tiempo_transcurrido)
+            # Esperar hasta el próximo tick (sin espera si vamos atrasados)
+            espera = proximo_tick - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
         
         # Calcular pérdida
         paquetes_perdidos = paquetes_enviados - paquetes_recibidos
@@ -84,11 +101,90 @@ def hacer_ping(ip, cantidad=10):
         # Solo retornar el archivo si hay al menos algunas respuestas válidas
         # y la pérdida no es mayor al 50% (VoIP no funciona con más pérdida)
         if latencias and len(latencias) >= 5 and porcentaje_perdida <= 50:
-            return nombre_archivo
+            return nombre_archivo, latencias, paquetes_enviados, paquetes_recibidos
         else:
-            return None
+            return None, latencias, paquetes_enviados, paquetes_recibidos
         
     except Exception as e:
+        return None, latencias, paquetes_enviados, paquetes_recibidos
+
+
+# Patrones precompilados para leer los archivos generados por hacer_ping
+_PATRON_LATENCIA = re.compile(r'time=(\d+\.?\d*)\s*ms', re.IGNORECASE)
+_PATRON_LATENCIA_PROMEDIO = re.compile(r'Latencia promedio:\s*(\d+\.?\d*)\s*ms', re.IGNORECASE)
+_PATRON_JITTER = re.compile(r'Jitter.*?:\s*(\d+\.?\d*)\s*ms', re.IGNORECASE)
+_PATRON_PAQUETES = re.compile(r'enviados\s*=\s*(\d+).*?recibidos\s*=\s*(\d+)', re.IGNORECASE)
+_PATRON_PORCENTAJE = re.compile(r'(\d+\.?\d*)%\s+(perdidos|loss)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=128)
+def _leer_archivo_ping(archivo, mtime):
+    """
+    Lee un archivo de ping y extrae todos los datos en una sola pasada.
+    Cacheado por (archivo, mtime): si el archivo cambia se vuelve a leer.
+    
+    Parámetros:
+    - archivo: Ruta del archivo con resultados de ping
+    - mtime: Fecha de modificación del archivo (clave de caché)
+    
+    Retorna:
+    - dict con 'latencias' (tupla de ms), 'enviados', 'recibidos' y los valores
+      alternativos 'latencia_promedio', 'jitter', 'porcentaje_perdida'
+      (None si no aparecen en el archivo)
+    """
+    with open(archivo, 'r', encoding='utf-8') as f:
+        contenido = f.read()
+    
+    # Buscar líneas con formato "Ping X: time=XX.XX ms"
+    latencias = tuple(float(m) for m in _PATRON_LATENCIA.findall(contenido))
+    
+    datos = {
+        'latencias': latencias,
+        'enviados': None,
+        'recibidos': None,
+        'latencia_promedio': None,
+        'jitter': None,
+        'porcentaje_perdida': None
+    }
+    
+    if not latencias:
+        # Intentar con formato alternativo (valores pre-calculados)
+        match_alt = _PATRON_LATENCIA_PROMEDIO.search(contenido)
+        if match_alt:
+            datos['latencia_promedio'] = float(match_alt.group(1))
+        match_alt = _PATRON_JITTER.search(contenido)
+        if match_alt:
+            datos['jitter'] = float(match_alt.group(1))
+    
+    # Formato propio: "enviados = X, recibidos = Y, perdidos = Z (W% perdidos)"
+    match = _PATRON_PAQUETES.search(contenido)
+    if match:
+        datos['enviados'] = int(match.group(1))
+        datos['recibidos'] = int(match.group(2))
+    else:
+        # Buscar porcentaje directo
+        match = _PATRON_PORCENTAJE.search(contenido)
+        if match:
+            datos['porcentaje_perdida'] = float(match.group(1))
+    
+    return datos
+
+
+def _parse_ping_file(archivo):
+    """
+    Obtiene los datos de un archivo de ping (ver _leer_archivo_ping).
+    
+    Parámetros:
+    - archivo: Ruta del archivo con resultados de ping
+    
+    Retorna:
+    - dict con los datos del archivo o None si no existe o hay error
+    """
+    try:
+        return _leer_archivo_ping(archivo, os.path.getmtime(archivo))
+    except FileNotFoundError:
+        return None
+    except Exception:
         return None
 
 
@@ -102,30 +198,15 @@ def calcular_latencia_promedio(archivo):
     Retorna:
     - latencia_promedio: Latencia promedio en ms o None si hay error
     """
-    try:
-        with open(archivo, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        # Buscar líneas con formato "Ping X: time=XX.XX ms"
-        import re
-        patron = r'time=(\d+\.?\d*)\s*ms'
-        matches = re.findall(patron, contenido, re.IGNORECASE)
-        
-        if not matches:
-            # Intentar con formato alternativo
-            patron_alt = r'Latencia promedio:\s*(\d+\.?\d*)\s*ms'
-            match_alt = re.search(patron_alt, contenido, re.IGNORECASE)
-            if match_alt:
-                return float(match_alt.group(1))
-            return None
-        
-        latencias = [float(m) for m in matches]
-        return statistics.mean(latencias)
-        
-    except FileNotFoundError:
-        return None
-    except Exception as e:
+    datos = _parse_ping_file(archivo)
+    if datos is None:
         return None
+    
+    latencias = datos['latencias']
+    if not latencias:
+        return datos['latencia_promedio']
+    
+    return statistics.mean(latencias)
 
 
 def calcular_jitter(archivo):
@@ -139,44 +220,27 @@ def calcular_jitter(archivo):
     Retorna:
     - jitter: Jitter en ms o None si hay error
     """
-    try:
-        with open(archivo, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-
-        import re
-
-        # Buscar líneas con formato "Ping X: time=XX.XX ms"
-        patron = r'time=(\d+\.?\d*)\s*ms'
-        matches = re.findall(patron, contenido, re.IGNORECASE)
-
-        if not matches:
-            # Intentar extraer jitter pre-calculado si existiera
-            patron_alt = r'Jitter.*?:\s*(\d+\.?\d*)\s*ms'
-            match_alt = re.search(patron_alt, contenido, re.IGNORECASE)
-            if match_alt:
-                return float(match_alt.group(1))
-            return None
-
-        latencias = [float(m) for m in matches]
-
-        if len(latencias) < 2:
-            return None
-
-        # Cálculo de jitter según PingPlotter:
-        # diferencia absoluta entre muestras consecutivas
-        diferencias = [
-            abs(latencias[i+1] - latencias[i])
-            for i in range(len(latencias) - 1)
-        ]
+    datos = _parse_ping_file(archivo)
+    if datos is None:
+        return None
 
-        jitter = sum(diferencias) / len(diferencias)
-        return jitter
+    latencias = datos['latencias']
+    if not latencias:
+        # Jitter pre-calculado si existiera
+        return datos['jitter']
 
-    except FileNotFoundError:
-        return None
-    except Exception:
+    if len(latencias) < 2:
         return None
 
+    # Cálculo de jitter según PingPlotter:
+    # diferencia absoluta entre muestras consecutivas
+    diferencias = [
+        abs(latencias[i+1] - latencias[i])
+        for i in range(len(latencias) - 1)
+    ]
+
+    jitter = sum(diferencias) / len(diferencias)
+    return jitter
 
 
 def calcular_paquetes_perdidos(archivo):
@@ -189,31 +253,17 @@ def calcular_paquetes_perdidos(archivo):
     Retorna:
     - porcentaje_perdida: Porcentaje de paquetes perdidos (0-100) o None si hay error
     """
-    try:
-        with open(archivo, 'r', encoding='utf-8') as f:
-            contenido = f.read()
-        
-        import re
-        # Formato propio: "enviados = X, recibidos = Y, perdidos = Z (W% perdidos)"
-        match = re.search(r'enviados\s*=\s*(\d+).*?recibidos\s*=\s*(\d+)', contenido, re.IGNORECASE)
-        if match:
-            enviados = int(match.group(1))
-            recibidos = int(match.group(2))
-            perdidos = enviados - recibidos
-            porcentaje = (perdidos / enviados) * 100 if enviados > 0 else 0
-            return porcentaje
-        
-        # Buscar porcentaje directo
-        match = re.search(r'(\d+\.?\d*)%\s+(perdidos|loss)', contenido, re.IGNORECASE)
-        if match:
-            return float(match.group(1))
-        
-        return None
-        
-    except FileNotFoundError:
-        return None
-    except Exception as e:
+    datos = _parse_ping_file(archivo)
+    if datos is None:
         return None
+    
+    enviados = datos['enviados']
+    if enviados is not None:
+        perdidos = enviados - datos['recibidos']
+        porcentaje = (perdidos / enviados) * 100 if enviados > 0 else 0
+        return porcentaje
+    
+    return datos['porcentaje_perdida']
 
 
 def calcular_mos(latencia_promedio, jitter, perdida_paquetes):
@@ -283,14 +333,18 @@ def analizar_ip(ip, cantidad_pings):
     """
     try:
         # Realizar ping
-        archivo = hacer_ping(ip, cantidad_pings)
+        archivo, latencias, enviados, recibidos = _medir_ping(ip, cantidad_pings)
         if not archivo:
             return {'error': True, 'mensaje': 'Conexión inestable o sin respuesta (>50% pérdida)'}
         
-        # Calcular métricas
-        latencia = calcular_latencia_promedio(archivo)
-        jitter = calcular_jitter(archivo)
-        perdida = calcular_paquetes_perdidos(archivo)
+        # Calcular métricas directamente con los datos medidos, sin releer el archivo
+        latencia = statistics.fmean(latencias) if latencias else None
+        # Jitter según PingPlotter: promedio de diferencias absolutas consecutivas
+        jitter = (
+            statistics.fmean([abs(b - a) for a, b in zip(latencias, latencias[1:])])
+            if len(latencias) >= 2 else None
+        )
+        perdida = ((enviados - recibidos) / enviados) * 100 if enviados > 0 else None
         
         # Verificar que tenemos todos los datos
         if latencia is None:
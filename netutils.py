@@ -1,13 +1,22 @@
 from ping3 import ping
+from functools import lru_cache
 import time
 from datetime import datetime
 import os
+import sys
 import sqlite3
-import re
-
+import socket
+import select
+import struct
+import itertools
+import threading
+from threading import Thread
+from queue import Queue, Full
+
+@lru_cache(maxsize=1024)
 def validar_ip(ip: str) -> bool:
     """
-    Valida si una cadena es una dirección IPv4 válida usando regex.
+    Valida si una cadena es una dirección IPv4 válida.
 
     Args:
         ip: Cadena a validar
@@ -22,15 +31,119 @@ def validar_ip(ip: str) -> bool:
         validar_ip("192.168.1")    -> False
         validar_ip("abc.def.ghi")  -> False
     """
-    # Patrón regex para IPv4
-    # Cada octeto puede ser:
-    # - 0-99: \d{1,2}
-    # - 100-199: 1\d{2}
-    # - 200-249: 2[0-4]\d
-    # - 250-255: 25[0-5]
-    patron = r'^((25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])\.){3}(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])$'
+    # inet_pton valida en C (libc) en lugar de usar regex. Es estricto:
+    # rechaza octetos > 255, ceros a la izquierda y formas abreviadas ("192.168.1")
+    try:
+        socket.inet_pton(socket.AF_INET, ip)
+    except (OSError, ValueError):
+        return False
+
+    return ip.count('.') == 3
+
+# Tipos de mensaje ICMP (RFC 792)
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# Cada thread reutiliza su propio socket ICMP en lugar de abrir y cerrar uno
+# por ping (como hace ping3). Por thread para que dos monitores no se roben
+# las respuestas entre sí.
+_icmp_local = threading.local()
+_secuencia_icmp = itertools.count(1)
+
+def _checksum_icmp(datos: bytes) -> int:
+    """
+    Calcula el checksum de Internet (complemento a uno de la suma de palabras de 16 bits).
+    """
+    if len(datos) % 2:
+        datos += b"\0"
+    suma = sum(struct.unpack(f"!{len(datos) // 2}H", datos))
+    suma = (suma >> 16) + (suma & 0xFFFF)
+    suma += suma >> 16
+    return ~suma & 0xFFFF
+
+def _socket_icmp():
+    """
+    Devuelve el socket ICMP del thread actual, creándolo la primera vez.
+
+    Intenta primero un socket DGRAM (ICMP sin privilegios: en Linux según
+    net.ipv4.ping_group_range, en macOS siempre) y después uno RAW (requiere
+    admin/root).
+
+    Returns:
+        Tupla (socket, es_raw), o None si no se puede abrir ninguno
+        (en ese caso ping_unico usa ping3)
+    """
+    if getattr(_icmp_local, "sin_socket", False):
+        return None
+
+    sock = getattr(_icmp_local, "sock", None)
+    if sock is not None:
+        return sock, _icmp_local.es_raw
+
+    for tipo, es_raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+        try:
+            sock = socket.socket(socket.AF_INET, tipo, socket.IPPROTO_ICMP)
+        except (OSError, ValueError):
+            continue
+        _icmp_local.sock = sock
+        _icmp_local.es_raw = es_raw
+        return sock, es_raw
+
+    _icmp_local.sin_socket = True
+    return None
+
+def _ping_socket(sock: socket.socket, es_raw: bool, ip: str, timeout: float):
+    """
+    Envía un echo request por el socket dado y espera la respuesta.
 
-    return re.match(patron, ip) is not None
+    Returns:
+        RTT en segundos, o None si no hubo respuesta dentro del timeout
+    """
+    identificador = os.getpid() & 0xFFFF
+    # En sockets DGRAM de Linux el kernel reemplaza el identificador y solo
+    # entrega al socket sus propias respuestas; en RAW y en DGRAM de macOS
+    # llegan todas las respuestas ICMP y hay que filtrar por identificador
+    verificar_id = es_raw or not sys.platform.startswith("linux")
+    secuencia = next(_secuencia_icmp) & 0xFFFF
+    datos = b"ping-grafico".ljust(32, b"\0")
+
+    cabecera = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, identificador, secuencia)
+    checksum = _checksum_icmp(cabecera + datos)
+    paquete = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, identificador, secuencia) + datos
+
+    try:
+        destino = socket.gethostbyname(ip)
+        inicio = time.perf_counter()
+        sock.sendto(paquete, (destino, 0))
+
+        limite = inicio + timeout
+        while True:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                return None
+
+            listos, _, _ = select.select([sock], [], [], restante)
+            if not listos:
+                return None
+
+            respuesta, (origen, _) = sock.recvfrom(1024)
+            fin = time.perf_counter()
+
+            # Los sockets RAW (y los DGRAM de macOS) entregan también la cabecera
+            # IP (IHL * 4 bytes); se detecta por la versión 4 en el primer byte,
+            # que en un mensaje ICMP sería el tipo (nunca 0x4X)
+            if respuesta and respuesta[0] >> 4 == 4:
+                respuesta = respuesta[(respuesta[0] & 0x0F) * 4:]
+            if len(respuesta) < 8:
+                continue
+
+            tipo, _, _, ident_resp, sec_resp = struct.unpack("!BBHHH", respuesta[:8])
+            if (origen == destino and tipo == ICMP_ECHO_REPLY and sec_resp == secuencia
+                    and (not verificar_id or ident_resp == identificador)):
+                return fin - inicio
+    except OSError:
+        # Red inalcanzable, host inválido, etc.: se trata como timeout
+        return None
 
 def ping_unico(ip: str) -> float:
     """
@@ -40,20 +153,114 @@ def ping_unico(ip: str) -> float:
     - Si no hay respuesta -> retorna -1
     - Si hay respuesta en < 1 seg -> retorna el ping en ms y espera hasta completar 1 segundo
     - Si tarda >= 1 seg -> retorna el ping en ms sin espera adicional
+    - Si falla al instante (p. ej. red inalcanzable) -> también espera hasta
+      completar 1 segundo, así un bucle de pings nunca gira sin pausa
     """
-    rtt = ping(ip, timeout=4)
+    # El intervalo se programa contra un tick absoluto con reloj monotónico
+    # (no afectado por cambios de hora del sistema): si la llamada anterior de
+    # este thread terminó a tiempo, este ping vence 1 s después del tick
+    # anterior, sin acumular el retraso del scheduler. Si vamos atrasados más
+    # de un intervalo (p. ej. tras un timeout), se resincroniza con el reloj.
+    ahora = time.monotonic()
+    tick = getattr(_icmp_local, "proximo_tick", None)
+    if tick is None or ahora - tick > 1.0:
+        tick = ahora
+    proximo_tick = tick + 1.0
+    _icmp_local.proximo_tick = proximo_tick
+
+    icmp = _socket_icmp()
+    if icmp is not None:
+        rtt = _ping_socket(icmp[0], icmp[1], ip, timeout=4)
+    else:
+        rtt = ping(ip, timeout=4)
+
+    # Solo espera si todavía no se llegó al próximo tick (con o sin respuesta)
+    espera = proximo_tick - time.monotonic()
+    if espera > 0:
+        time.sleep(espera)
 
     if rtt is None:
         return -1
 
-    ms = rtt * 1000
+    return rtt * 1000
 
-    # Solo espera si el ping fue más rápido que 1 segundo
-    espera = 1 - rtt
-    if espera > 0:
-        time.sleep(espera)
+# Versión del esquema de la tabla pings (se guarda en PRAGMA user_version)
+#   0: tiempo_ms REAL en milisegundos, -1 = timeout
+#   1: tiempo_us INTEGER en microsegundos, NULL = timeout (filas ~50% más chicas)
+#   2: id INTEGER PRIMARY KEY sin AUTOINCREMENT (sin escribir sqlite_sequence por lote)
+VERSION_ESQUEMA = 2
 
-    return ms
+def migrar_esquema(conn: sqlite3.Connection):
+    """
+    Actualiza una base de datos de pings existente al esquema actual (VERSION_ESQUEMA).
+    Si la base de datos es nueva (sin tabla pings) solo marca la versión.
+    Es seguro llamarla varias veces, y desde varios procesos a la vez.
+
+    Args:
+        conn: Conexión de lectura/escritura en modo autocommit (isolation_level=None)
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= VERSION_ESQUEMA:
+        return
+
+    # Toda la migración (reconstrucción de la tabla y user_version) es una sola
+    # transacción: o queda hecha completa o no se hizo nada
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Volver a leer la versión con el lock de escritura tomado: otro proceso
+        # pudo haber migrado entre la lectura anterior y el BEGIN
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= VERSION_ESQUEMA:
+            conn.execute("ROLLBACK")
+            return
+
+        tiene_tabla = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pings'"
+        ).fetchone()
+
+        # Las migraciones reconstruyen la tabla (SQLite no permite cambiar el tipo
+        # de una columna ni quitar AUTOINCREMENT) conservando los ids; los índices
+        # de la tabla vieja se borran con ella y se recrean en la misma transacción
+        if tiene_tabla:
+            if version < 1:
+                # v0 -> v2: tiempo_ms REAL (-1 = timeout) -> tiempo_us INTEGER (NULL = timeout)
+                tiempo_us = ("CASE WHEN tiempo_ms = -1 THEN NULL "
+                             "ELSE CAST(ROUND(tiempo_ms * 1000) AS INTEGER) END")
+            else:
+                # v1 -> v2: mismas columnas, id sin AUTOINCREMENT
+                tiempo_us = "tiempo_us"
+
+            conn.execute("""
+                CREATE TABLE pings_nueva (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    tiempo_us INTEGER
+                )
+            """)
+            conn.execute(
+                "INSERT INTO pings_nueva (id, timestamp, tiempo_us) "
+                f"SELECT id, timestamp, {tiempo_us} FROM pings"
+            )
+            conn.execute("DROP TABLE pings")
+            conn.execute("ALTER TABLE pings_nueva RENAME TO pings")
+            conn.execute("CREATE INDEX idx_ts_lat ON pings(timestamp, tiempo_us)")
+            conn.execute("CREATE INDEX idx_tiempo ON pings(tiempo_us) WHERE tiempo_us IS NOT NULL")
+
+        # La versión se marca dentro de la misma transacción, antes del COMMIT
+        conn.execute(f"PRAGMA user_version={VERSION_ESQUEMA}")
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+def _ms_a_us(tiempo_ms: float):
+    """
+    Convierte un resultado de ping_unico (ms, -1 si timeout) al valor que se
+    guarda en la columna tiempo_us (microsegundos enteros, None si timeout).
+    """
+    if tiempo_ms == -1:
+        return None
+    return int(round(tiempo_ms * 1000))
 
 def preparar_bd_sqlite(ip: str) -> sqlite3.Connection:
     """
@@ -63,7 +270,9 @@ def preparar_bd_sqlite(ip: str) -> sqlite3.Connection:
 
     OPTIMIZACIONES PARA GRABACIÓN 24/7:
     - Modo WAL (Write-Ahead Logging) para mejor concurrencia
-    - Pragmas optimizados para reducir latencia de escritura
+    - Pragmas optimizados para reducir latencia de escritura (conjunto seguro
+      con WAL: synchronous=NORMAL, busy_timeout, cache_size, mmap_size,
+      wal_autocheckpoint)
     - Batch commits para evitar bloquear el thread de pings
 
     Args:
@@ -91,8 +300,16 @@ def preparar_bd_sqlite(ip: str) -> sqlite3.Connection:
     # Ruta de la base de datos
     ruta_bd = os.path.join(carpeta, "datos.db")
 
-    # Conectar a la base de datos (se crea si no existe)
-    conn = sqlite3.connect(ruta_bd, check_same_thread=False)
+    # Conectar a la base de datos (se crea si no existe).
+    # isolation_level=None: modo autocommit, sin las transacciones implícitas del
+    # módulo sqlite3; las escrituras por lotes abren su propia transacción
+    # explícita (ver BatchPingSaver.flush)
+    conn = sqlite3.connect(
+        ruta_bd,
+        check_same_thread=False,
+        cached_statements=256,
+        isolation_level=None
+    )
 
     # ===== OPTIMIZACIONES DE RENDIMIENTO =====
     cursor = conn.cursor()
@@ -108,30 +325,60 @@ def preparar_bd_sqlite(ip: str) -> sqlite3.Connection:
     cursor.execute("PRAGMA synchronous=NORMAL")
 
     # 3. cache_size: Mantener más páginas en memoria (default=2000 páginas = ~8MB)
-    #    Aumentar a 10000 páginas = ~40MB para operaciones 24/7
-    cursor.execute("PRAGMA cache_size=10000")
+    #    Valor negativo = tamaño en KiB: -65536 = 64MB para operaciones 24/7
+    cursor.execute("PRAGMA cache_size=-65536")
 
     # 4. temp_store=MEMORY: Usar RAM para operaciones temporales
     cursor.execute("PRAGMA temp_store=MEMORY")
 
+    # 5. busy_timeout: Esperar hasta 5s si otro proceso (API, visor) tiene el lock,
+    #    en lugar de fallar inmediatamente con SQLITE_BUSY
+    cursor.execute("PRAGMA busy_timeout=5000")
+
+    # 6. mmap_size: Leer páginas vía memoria mapeada (hasta 256MB), sin copiar
+    #    cada página del kernel a un buffer propio de SQLite
+    cursor.execute("PRAGMA mmap_size=268435456")
+
+    # 7. wal_autocheckpoint: Checkpoint cada 2000 páginas (default=1000) para
+    #    hacer menos checkpoints durante la grabación continua
+    cursor.execute("PRAGMA wal_autocheckpoint=2000")
+
+    # Migrar bases de datos creadas con un esquema anterior
+    migrar_esquema(conn)
+
     # Crear la tabla si no existe
+    #   id: alias del rowid; sin AUTOINCREMENT no se actualiza sqlite_sequence en cada lote
+    #   tiempo_us: latencia en microsegundos (entero), NULL si hubo timeout
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS pings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             timestamp TEXT NOT NULL,
-            tiempo_ms REAL NOT NULL
+            tiempo_us INTEGER
         )
     """)
 
-    # Crear índice en timestamp para consultas rápidas
+    # Índice cubriente (timestamp, tiempo_us) para consultas rápidas: los filtros
+    # por rango de fechas se resuelven solo con el índice, sin leer la tabla.
+    # Reemplaza al antiguo índice de una sola columna idx_timestamp.
+    cursor.execute("DROP INDEX IF EXISTS idx_timestamp")
     cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_timestamp ON pings(timestamp)
+        CREATE INDEX IF NOT EXISTS idx_ts_lat ON pings(timestamp, tiempo_us)
+    """)
+
+    # Índice parcial sobre latencias exitosas: permite a la API calcular
+    # percentiles con ORDER BY tiempo_us LIMIT 1 OFFSET n sin ordenar en memoria
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tiempo ON pings(tiempo_us) WHERE tiempo_us IS NOT NULL
     """)
 
     conn.commit()
 
     return conn
 
+# Sentencia de inserción de BatchPingSaver (misma cadena siempre: se reutiliza
+# la sentencia preparada de la caché de la conexión)
+_SQL_INSERT_PING = "INSERT INTO pings (timestamp, tiempo_us) VALUES (?, ?)"
+
 class BatchPingSaver:
     """
     Gestor de guardado por lotes para optimizar escrituras a SQLite.
@@ -143,29 +390,42 @@ class BatchPingSaver:
     permitiendo que los pings se ejecuten con mayor precisión temporal.
     """
 
-    def __init__(self, conn: sqlite3.Connection, batch_size: int = 10):
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = 10,
+                 intervalo_flush: float = 5.0):
         """
         Args:
             conn: Conexión a la base de datos SQLite
             batch_size: Cantidad de pings a acumular antes de hacer commit
+            intervalo_flush: Segundos máximos entre commits aunque el batch no
+                esté lleno (limita los datos pendientes y su retraso en el visor/API)
         """
         self.conn = conn
         self.batch_size = batch_size
-        self.buffer = []  # [(timestamp, tiempo_ms), ...]
+        self.intervalo_flush = intervalo_flush
+        self.buffer = []  # [(timestamp, tiempo_us), ...]
         self.cursor = conn.cursor()
+        self.ultimo_flush = time.monotonic()
+        self.flush_fallido = False  # El último flush falló (base bloqueada, disco lleno)
 
-    def agregar_ping(self, tiempo_ms: float):
+    def agregar_ping(self, tiempo_ms: float, timestamp: str = None):
         """
-        Agrega un ping al buffer. Hace commit automático si se alcanza batch_size.
+        Agrega un ping al buffer. Hace commit automático si se alcanza batch_size
+        o si pasaron más de intervalo_flush segundos desde el último commit.
+        Después de un flush fallido solo se reintenta al pasar intervalo_flush,
+        para no repetir BEGIN IMMEDIATE (y su espera de busy_timeout) en cada ping.
 
         Args:
             tiempo_ms: Tiempo de respuesta en milisegundos (-1 si timeout)
+            timestamp: Momento del ping ("YYYY-MM-DD HH:MM:SS"); por defecto, ahora
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.buffer.append((timestamp, tiempo_ms))
-
-        # Hacer commit si se alcanzó el tamaño del batch
-        if len(self.buffer) >= self.batch_size:
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.buffer.append((timestamp, _ms_a_us(tiempo_ms)))
+
+        # Hacer commit si se alcanzó el tamaño del batch o el tiempo máximo
+        lleno = len(self.buffer) >= self.batch_size
+        vencido = time.monotonic() - self.ultimo_flush > self.intervalo_flush
+        if vencido or (lleno and not self.flush_fallido):
             self.flush()
 
     def flush(self):
@@ -173,17 +433,24 @@ class BatchPingSaver:
         Fuerza el guardado de todos los pings pendientes en el buffer.
         Llamar al cerrar la aplicación para no perder datos.
         """
+        self.ultimo_flush = time.monotonic()
         if not self.buffer:
             return
 
-        # Insertar todos los pings del buffer
-        self.cursor.executemany(
-            "INSERT INTO pings (timestamp, tiempo_ms) VALUES (?, ?)",
-            self.buffer
-        )
-        self.conn.commit()
+        # Insertar todos los pings del buffer en una sola transacción explícita.
+        # BEGIN IMMEDIATE toma el lock de escritura al inicio (una sola vez por lote)
+        self.flush_fallido = True
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self.cursor.executemany(_SQL_INSERT_PING, self.buffer)
+            self.cursor.execute("COMMIT")
+        except Exception:
+            # Deshacer y conservar el buffer para reintentar en el próximo flush
+            self.cursor.execute("ROLLBACK")
+            raise
 
         # Limpiar buffer
+        self.flush_fallido = False
         self.buffer.clear()
 
     def close(self):
@@ -195,21 +462,100 @@ def guardar_ping(conn: sqlite3.Connection, tiempo_ms: float):
     """
     Guarda un ping en la base de datos SQLite (modo inmediato, sin batch).
 
-    NOTA: Esta función hace commit() inmediato, lo cual puede causar latencia
-    en operaciones 24/7. Para mejor rendimiento, usar BatchPingSaver.
+    NOTA: Esta función hace commit() inmediato (un fsync por ping), lo cual puede
+    causar latencia en operaciones 24/7. Se mantiene por compatibilidad; el
+    monitoreo (grabar_ping, visorIndividual) usa BatchPingSaver.
 
     Args:
         conn: Conexión a la base de datos SQLite
-        tiempo_ms: Tiempo de respuesta en milisegundos
+        tiempo_ms: Tiempo de respuesta en milisegundos (-1 si timeout)
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO pings (timestamp, tiempo_ms) VALUES (?, ?)",
-        (timestamp, tiempo_ms)
+    # El timestamp lo genera SQLite al insertar (hora local), sin trabajo en Python.
+    # conn.execute reutiliza la sentencia preparada de la caché de sqlite3
+    conn.execute(
+        "INSERT INTO pings (timestamp, tiempo_us) "
+        "VALUES (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'), ?)",
+        (_ms_a_us(tiempo_ms),)
     )
     conn.commit()
 
+# Máximo de pings esperando al thread escritor (~1 hora a un ping por segundo),
+# tanto en la cola como en el buffer de un lote que no se pudo guardar.
+# Si el escritor se atrasa tanto (disco lleno, base bloqueada), el productor
+# descarta los pings nuevos y el escritor los más antiguos del buffer, en lugar
+# de acumular memoria sin límite
+MAX_COLA_ESCRITURA = 3600
+
+def escritor_pings(batch_saver: BatchPingSaver, cola: Queue, avisar=print):
+    """
+    Loop de un thread escritor (grabar_ping, visorIndividual): consume
+    (timestamp, tiempo_ms) de la cola y los guarda por lotes, para que el loop
+    de pings no espere al disco.
+    Al recibir None guarda los pings pendientes y termina.
+
+    Un error al guardar no termina el thread: el lote queda en el buffer de
+    batch_saver y se reintenta cada intervalo_flush segundos. Si el buffer
+    supera MAX_COLA_ESCRITURA se descartan los pings más antiguos. Se avisa el
+    primer error de la racha y, al recuperarse, cuántos pings se descartaron.
+
+    Args:
+        batch_saver: Gestor de guardado por lotes de la conexión
+        cola: Cola de pings a guardar
+        avisar: Función que recibe el mensaje de cada error (por defecto print)
+    """
+    fallando = False
+    descartados = 0
+    while True:
+        item = cola.get()
+        if item is None:
+            break
+
+        timestamp, tiempo_ms = item
+        try:
+            batch_saver.agregar_ping(tiempo_ms, timestamp)
+        except Exception as e:
+            if not fallando:
+                avisar(f"Error al guardar pings (se reintenta cada "
+                       f"{batch_saver.intervalo_flush:g} s): {e}")
+            fallando = True
+
+        # Limitar el buffer mientras los guardados fallan
+        exceso = len(batch_saver.buffer) - MAX_COLA_ESCRITURA
+        if exceso > 0:
+            del batch_saver.buffer[:exceso]
+            descartados += exceso
+
+        if fallando and not batch_saver.buffer:
+            fallando = False
+            if descartados:
+                avisar(f"Grabación recuperada: {descartados} pings antiguos descartados "
+                       f"por falta de espacio en el buffer, el resto guardado")
+            else:
+                avisar("Grabación recuperada: pings pendientes guardados")
+            descartados = 0
+
+    # Guardar los pendientes antes de terminar (con algunos reintentos)
+    for intento in range(3):
+        try:
+            batch_saver.close()
+            return
+        except Exception as e:
+            avisar(f"Error al guardar los últimos {len(batch_saver.buffer)} pings: {e}")
+            time.sleep(1)
+
+def encolar_ping(cola: Queue, timestamp: str, tiempo_ms: float) -> bool:
+    """
+    Encola un ping para el thread escritor sin bloquear el loop de pings.
+
+    Returns:
+        False si la cola está llena (el escritor no da abasto) y el ping se descartó
+    """
+    try:
+        cola.put_nowait((timestamp, tiempo_ms))
+        return True
+    except Full:
+        return False
+
 def grabar_ping(ip: str):
     """
     Monitorea continuamente una IP haciendo pings y guardando los resultados en SQLite.
@@ -237,6 +583,13 @@ def grabar_ping(ip: str):
     conn = preparar_bd_sqlite(ip)
     print(f"Base de datos preparada")
 
+    # Guardar por lotes (un solo commit cada 60 pings, o cada 5 s como máximo)
+    # en un thread aparte: el loop solo encola el resultado y sigue con el siguiente ping
+    batch_saver = BatchPingSaver(conn, batch_size=60)
+    cola_escritura = Queue(maxsize=MAX_COLA_ESCRITURA)
+    escritor = Thread(target=escritor_pings, args=(batch_saver, cola_escritura), daemon=True)
+    escritor.start()
+
     contador_total = 0
 
     try:
@@ -244,8 +597,10 @@ def grabar_ping(ip: str):
             # Hacer ping
             resultado = ping_unico(ip)
 
-            # Guardar en la base de datos
-            guardar_ping(conn, resultado)
+            # Encolar para guardar en la base de datos
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+            if not encolar_ping(cola_escritura, timestamp, resultado):
+                print(f"  Cola de escritura llena: ping de {timestamp} descartado")
 
             # Incrementar contador
             contador_total += 1
@@ -259,7 +614,11 @@ def grabar_ping(ip: str):
         print(f"\n\nMonitoreo detenido")
         print(f"Total de pings guardados: {contador_total}")
     finally:
-        # Cerrar la conexión al terminar
+        # Avisar al escritor que termine (guarda los pings pendientes) y esperarlo
+        cola_escritura.put(None)
+        escritor.join()
+        # Actualizar estadísticas del planificador antes de cerrar
+        conn.execute("PRAGMA optimize")
         conn.close()
         print("Conexión a base de datos cerrada")
 
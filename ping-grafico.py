@@ -1,24 +1,26 @@
 """
 ping_pyqtgraph.py
 Monitorea una IP con ping persistente (-t) y muestra gráfica en tiempo real usando pyqtgraph.
-Instalar: pip install pyqt5 pyqtgraph
+Instalar: pip install pyqt5 pyqtgraph ping3
 """
 
 import sys
-import subprocess
-import re
 import time
 from collections import deque
+from pathlib import Path
 import os
 from dotenv import load_dotenv
 from threading import Thread
-from queue import Queue
 
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QTextCursor, QTextCharFormat, QColor
 from PyQt5.QtWidgets import QMessageBox
-import pyqtgraph as pg
-import json
+import numpy as np
+import orjson
+
+from netutils import ping_unico, validar_ip
+from graficos import configurar_opengl
 
 load_dotenv()
 
@@ -36,35 +38,67 @@ TIEMPO_MAXIMO = int(os.getenv("TIEMPO_MAXIMO", 100))
 COLOR_ALERTA = os.getenv("COLOR_ALERTA", "#FF0000")
 
 
-def validar_ip(ip):
-    import ipaddress
+# Última lectura de direcciones.json: solo se vuelve a parsear si cambió en disco
+_cache_direcciones = {"firma": None, "datos": []}
+
+def _firma_json():
+    """(mtime, tamaño) del archivo JSON, o None si no existe."""
     try:
-        ipaddress.ip_address(ip)
-        return True
-    except:
-        return False
+        st = os.stat(RUTA_JSON)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
 def cargar_direcciones():
-    """Carga lista de direcciones desde JSON."""
-    if not os.path.exists(RUTA_JSON):
-        return []
-    try:
-        with open(RUTA_JSON, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
+    """Carga lista de direcciones desde JSON (en caché mientras el archivo no cambie)."""
+    firma = _firma_json()
+    if firma is None:
         return []
+    if firma != _cache_direcciones["firma"]:
+        try:
+            with open(RUTA_JSON, "rb") as f:
+                datos = orjson.loads(f.read())
+        except:
+            return []
+        _cache_direcciones["firma"] = firma
+        _cache_direcciones["datos"] = datos
+    return list(_cache_direcciones["datos"])
 
 def guardar_direcciones(lista):
-    """Guarda lista de direcciones en JSON."""
+    """Guarda lista de direcciones en JSON y actualiza la caché."""
     try:
-        with open(RUTA_JSON, "w", encoding="utf-8") as f:
-            json.dump(lista, f, indent=4, ensure_ascii=False)
+        # Se escribe a un temporal y se reemplaza: nunca queda un archivo a medias
+        temporal = RUTA_JSON + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(orjson.dumps(lista, option=orjson.OPT_INDENT_2))
+        os.replace(temporal, RUTA_JSON)
+        _cache_direcciones["firma"] = _firma_json()
+        _cache_direcciones["datos"] = list(lista)
     except Exception as e:
         print("Error guardando archivo JSON:", e)
 
+def habilitar_ansi():
+    """En Windows activa las secuencias ANSI (VT) en la consola; en otros sistemas ya lo están."""
+    if os.name != "nt":
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        modo = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(modo)):
+            kernel32.SetConsoleMode(handle, modo.value | 0x0004)  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except Exception:
+        pass
+
+def limpiar_pantalla():
+    """Limpia la consola con una secuencia ANSI (sin lanzar cmd.exe como os.system('cls'))."""
+    sys.stdout.write("\x1b[2J\x1b[H")
+    sys.stdout.flush()
+
 def menu_principal():
     while True:
-        os.system('cls')
+        limpiar_pantalla()
         print("\n=========== MENÚ PRINCIPAL ===========")
         print("\n")
         print("1) Iniciar monitoreo")
@@ -86,7 +120,7 @@ def menu_principal():
 
 def menu_monitoreo():
     while True:
-        os.system('cls')
+        limpiar_pantalla()
         print("\n======= INICIAR MONITOREO =======")
         print("\n")
         print("1) Elegir de direcciones guardadas")
@@ -136,8 +170,9 @@ def agregar_direccion():
 
     ip = input("IP: ").strip()
 
+    # Solo IPv4: ping_unico usa sockets ICMP AF_INET
     if not validar_ip(ip):
-        print("IP no válida.")
+        print("IP no válida (debe ser IPv4).")
         return
 
     direcciones = cargar_direcciones()
@@ -155,136 +190,115 @@ def agregar_direccion():
 
 
 # ---------------------------
-# Thread para leer ping continuo
+# Thread de ping continuo
 # ---------------------------
 class PingThread(Thread):
+    """Thread que hace pings continuos en el mismo proceso usando ping_unico()."""
+
     def __init__(self, ip, queue):
         super().__init__(daemon=True)
         self.ip = ip
         self.queue = queue
         self.running = True
-        self.process = None
+        # Referencia de reloj: los timestamps de las muestras se derivan del reloj
+        # monotónico, así el espaciado entre muestras no sufre ajustes finos de hora
+        self._ts0_wall = time.time()
+        self._ts0_mono = time.monotonic()
+
+    def _ahora(self):
+        """
+        Hora de pared derivada del reloj monotónico. Si se aparta más de 1 s de
+        time.time() (suspensión del equipo, salto de NTP o cambio de hora) se
+        vuelve a anclar, para que los timestamps sigan la hora real.
+        """
+        mono = time.monotonic()
+        ahora = self._ts0_wall + (mono - self._ts0_mono)
+        pared = time.time()
+        if abs(pared - ahora) > 1.0:
+            self._ts0_wall, self._ts0_mono = pared, mono
+            ahora = pared
+        return ahora
 
     def run(self):
-        """Ejecuta ping -n 100 repetidamente y lee línea por línea."""
+        """Hace un ping por segundo (ICMP directo, sin lanzar ping.exe) hasta stop()."""
         try:
             while self.running:
-                # Ejecutar ping -n 100 (Windows) o -c 100 (Linux/Mac)
-                if sys.platform == "win32":
-                    cmd = ["ping", "-n", "100", self.ip]
-                else:
-                    cmd = ["ping", "-c", "100", self.ip]
-                
-                self.process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1
-                )
-
-                # Leer línea por línea
-                for line in iter(self.process.stdout.readline, ''):
-                    if not self.running:
-                        break
-                    
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    # Procesar línea
-                    ts = time.time()
-                    ms, linea_limpia = self.parse_line(line)
-                    
-                    # Enviar a la cola solo si es una línea válida
-                    if linea_limpia is not None:
-                        self.queue.put((ts, ms, linea_limpia))
-                
-                # Esperar a que termine el proceso
-                self.process.wait()
-                
-                # Si no estamos corriendo, salir del loop
+                resultado = ping_unico(self.ip)
+                ts = self._ahora()
+
                 if not self.running:
                     break
 
+                if resultado == -1:
+                    self.queue.append((ts, None, "error: Tiempo de espera agotado"))
+                else:
+                    ms = round(resultado, 1)
+                    self.queue.append((ts, ms, f"Respuesta desde {self.ip}: tiempo={ms}ms"))
+
         except Exception as e:
-            self.queue.put((time.time(), None, f"error: {str(e)}"))
-        finally:
-            if self.process:
-                self.process.terminate()
-
-    def parse_line(self, line):
-        """Parsea una línea de ping y extrae latencia y mensaje limpio."""
-        # Buscar línea de respuesta
-        if "Respuesta desde" in line or "Reply from" in line or "bytes from" in line.lower():
-            # Extraer latencia
-            m = re.search(r"(?:Tiempo|tiempo|time|Time)=? ?(\d+)ms", line)
-            if m:
-                ms = int(m.group(1))
-                return ms, line
-            else:
-                return None, line
-        
-        # Detectar errores comunes
-        elif "inaccesible" in line.lower() or "unreachable" in line.lower():
-            return None, f"error: {line}"
-        elif "no pudo encontrar" in line.lower() or "could not find" in line.lower():
-            return None, f"error: {line}"
-        elif "Tiempo de espera" in line or "Request timed out" in line or "timed out" in line.lower():
-            return None, "error: Tiempo de espera agotado"
-        
-        # Ignorar líneas de encabezado o estadísticas
-        elif "Haciendo ping" in line or "Pinging" in line:
-            return None, None  # Ignorar
-        elif "Estadísticas" in line or "Statistics" in line:
-            return None, None  # Ignorar
-        elif "Paquetes:" in line or "Packets:" in line:
-            return None, None  # Ignorar
-        elif "Aproximado" in line or "Approximate" in line:
-            return None, None  # Ignorar
-        elif "Mínimo" in line or "Minimum" in line:
-            return None, None  # Ignorar
-        
-        # Línea desconocida pero podría ser relevante
-        return None, line
+            self.queue.append((self._ahora(), None, f"error: {str(e)}"))
 
     def stop(self):
         """Detiene el thread."""
         self.running = False
-        if self.process:
-            self.process.terminate()
 
 
 # ---------------------------
 # Ventana principal
 # ---------------------------
 class PingMonitor(QtWidgets.QMainWindow):
-    ping_signal = pyqtSignal(float, object, str)  # ts, ms, linea
+    ping_signal = pyqtSignal(list)  # lote de (ts, ms, linea)
 
     def __init__(self, ip, nombre=None):
         super().__init__()
         self.ip = ip
         self.nombre = nombre
 
-        self.latencias = []
-        self.tiempos = []
-        self.historial = []
-
         self.ts_inicio = time.time()
-        self.historial = []
-
-        # Datos
-        self.latencias = deque(maxlen=MAX_POINTS)
-        self.tiempos = deque(maxlen=MAX_POINTS)
+        # Últimas MAX_POINTS muestras (para "Exportar sesión"); la sesión completa
+        # queda en los CSV de bloque, así que no hace falta guardar todo en memoria
+        self.historial = deque(maxlen=MAX_POINTS)
+
+        # CSV del bloque en curso: cada muestra se escribe al llegar (buffer de
+        # 64KB) en lugar de volcar todo el historial al completar el bloque
+        self._csv = None
+        self._csv_filas = 0
+
+        # Carpetas de salida calculadas una sola vez (no en cada guardado)
+        self._carpeta_base = Path(__file__).resolve().parent
+        self._carpeta_bloques = self._carpeta_base / "pings" / self.ip
+        self._carpeta_bloques.mkdir(parents=True, exist_ok=True)
+
+        # Datos de la gráfica: buffers NumPy preasignados (el doble de MAX_POINTS).
+        # Las últimas MAX_POINTS muestras son siempre la vista contigua
+        # [_inicio:_fin]; al llegar al final del buffer se copian al principio
+        # (una copia cada MAX_POINTS pings, en lugar de list() en cada ping).
+        # Latencias en float32 (camino rápido de pyqtgraph), NaN = fallo;
+        # los timestamps necesitan float64 para conservar la precisión
+        self._latencias = np.full(2 * MAX_POINTS, np.nan, dtype=np.float32)
+        self._tiempos = np.zeros(2 * MAX_POINTS, dtype=np.float64)
+        # Etiqueta "HH:MM:SS" de cada muestra, formateada una sola vez al llegar
+        self._etiquetas = [""] * (2 * MAX_POINTS)
+        self._inicio = 0
+        self._fin = 0
+        self._x = np.arange(MAX_POINTS, dtype=np.float32)  # Eje X reutilizable
+        self._ceros = np.zeros(MAX_POINTS, dtype=np.float32)  # Y de los puntos de fallo
+        self._ultimo_fin_x = -1  # Último extremo derecho aplicado con setXRange
+        self._scatter_con_fallos = False  # El scatter tiene puntos dibujados
+        self._clave_ticks = None  # (primer ts, paso, cantidad) de los ticks aplicados
         
-        # Para estadísticas
-        self.latencias_validas = []  # Solo latencias exitosas (no None)
+        # Para estadísticas: latencias exitosas acumuladas (O(1) por ping)
+        self.lat_min = float('inf')
+        self.lat_max = float('-inf')
+        self.lat_suma = 0.0
+        self.lat_cuenta = 0
         self.paquetes_enviados = 0
         self.paquetes_recibidos = 0
         self.paquetes_perdidos = 0
 
-        # Queue para comunicación con thread
-        self.ping_queue = Queue()
+        # Cola para comunicación con thread: un solo productor (PingThread) y un
+        # solo consumidor (timer de Qt); append/popleft de deque son atómicos
+        self.ping_queue = deque()
         
         # Thread de ping
         self.ping_thread = PingThread(self.ip, self.ping_queue)
@@ -294,7 +308,14 @@ class PingMonitor(QtWidgets.QMainWindow):
         self.plot_widget.setYRange(0, 300)
 
         # Conectar señal
-        self.ping_signal.connect(self.process_ping_result)
+        self.ping_signal.connect(self.process_ping_lote)
+
+        # Timer de un disparo que agrupa los redibujados de la gráfica
+        self._repaint_timer = QtCore.QTimer()
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.setTimerType(Qt.PreciseTimer)
+        self._repaint_timer.setInterval(self._intervalo_repintado())
+        self._repaint_timer.timeout.connect(self.update_plot)
 
         # Timer para chequear la cola
         self.queue_timer = QtCore.QTimer()
@@ -305,12 +326,26 @@ class PingMonitor(QtWidgets.QMainWindow):
         # Iniciar thread de ping
         self.ping_thread.start()
 
+    @staticmethod
+    def _intervalo_repintado():
+        """Intervalo (ms) del redibujado: ~30 Hz redondeado a un múltiplo del refresco de pantalla."""
+        pantalla = QtWidgets.QApplication.primaryScreen()
+        refresco = pantalla.refreshRate() if pantalla is not None else 0
+        if refresco <= 0:
+            return 33
+        frame = 1000.0 / refresco
+        return int(round(max(1, round(33 / frame)) * frame))
+
     def init_ui(self):
+        # pyqtgraph solo se usa en la ventana: se importa aquí para no cargarlo
+        # mientras se navega por el menú de consola
+        import pyqtgraph as pg
+
         # Título con nombre (si existe) e IP
         if self.nombre:
-            titulo = f"Ping Monitor — {self.nombre} ({self.ip}) [Lotes de 100]"
+            titulo = f"Ping Monitor — {self.nombre} ({self.ip})"
         else:
-            titulo = f"Ping Monitor — {self.ip} [Lotes de 100]"
+            titulo = f"Ping Monitor — {self.ip}"
         
         self.setWindowTitle(titulo)
         try:
@@ -328,17 +363,30 @@ class PingMonitor(QtWidgets.QMainWindow):
         self.status_label = QtWidgets.QLabel("Iniciando ping persistente...")
         layout.addWidget(self.status_label)
 
-        # Plot widget de pyqtgraph
-        pg.setConfigOptions(antialias=True)
+        # Plot widget de pyqtgraph (sin antialias: es el mayor costo al pintar la curva)
         self.plot_widget = pg.PlotWidget()
         self.plot_widget.showGrid(x=True, y=True)
         self.plot_widget.setLabel("left", "Latencia (ms)")
         self.plot_widget.setLabel("bottom", "Hora")
         layout.addWidget(self.plot_widget)
 
-        # Curve (línea) y scatter para fallos
-        self.curve = self.plot_widget.plot([], [], pen=pg.mkPen(color='b', width=3))
+        # Curve (línea) y scatter para fallos.
+        # Pen de 1px, downsampling automático por picos (conserva máximos y mínimos)
+        # y solo se dibuja el tramo visible; el resultado se cachea como pixmap
+        # connect='finite': los fallos (NaN) cortan la línea. No se usa
+        # skipFiniteCheck: los datos tienen NaN, y pyqtgraph necesita detectarlos
+        # (p.ej. para el rango de autoescala y el downsampling por picos)
+        self.curve = self.plot_widget.plot(
+            [], [],
+            pen=pg.mkPen(color='b', width=1),
+            antialias=False,
+            connect='finite'
+        )
+        self.curve.setDownsampling(auto=True, method='peak')
+        self.curve.setClipToView(True)
+        self.curve.setCacheMode(QtWidgets.QGraphicsItem.DeviceCoordinateCache)
         self.scatter = pg.ScatterPlotItem(size=8, brush=pg.mkBrush(255, 0, 0))
+        self.scatter.setCacheMode(QtWidgets.QGraphicsItem.DeviceCoordinateCache)
         self.plot_widget.addItem(self.scatter)
 
         # Botones
@@ -349,10 +397,16 @@ class PingMonitor(QtWidgets.QMainWindow):
         self.btn_pause.toggled.connect(self.toggle_pause)
         btn_layout.addWidget(self.btn_pause)
 
-        self.console = QtWidgets.QTextEdit()
+        # Texto plano con formato por fragmento: sin parsear HTML en cada línea
+        self.console = QtWidgets.QPlainTextEdit()
         self.console.setReadOnly(True)
-        self.console.setLineWrapMode(QtWidgets.QTextEdit.NoWrap)
-        self.console.setFontFamily("Courier")
+        self.console.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        # Limitar la cantidad de líneas para que la memoria no crezca sin fin en 24/7
+        self.console.setMaximumBlockCount(5000)
+        # Cursor reutilizado para escribir al final sin pasar por appendPlainText()
+        self._console_cursor = QTextCursor(self.console.document())
+        self._formatos = {}  # color -> QTextCharFormat
+        self._bloques_pie = 0  # Bloques del pie de estadísticas al final de la consola
 
         self.btn_toggle_console = QtWidgets.QPushButton("Ocultar Terminal")
         self.btn_toggle_console.setCheckable(True)
@@ -366,6 +420,7 @@ class PingMonitor(QtWidgets.QMainWindow):
         """)
 
         font = self.console.font()
+        font.setFamily("Courier")
         font.setPointSize(FONT_SIZE)
         self.console.setFont(font)
 
@@ -392,18 +447,41 @@ class PingMonitor(QtWidgets.QMainWindow):
             self.btn_toggle_console.setText("Ocultar Terminal")
 
     def check_queue(self):
-        """Revisa la cola y emite señales para procesar en el thread principal."""
-        while not self.ping_queue.empty():
-            ts, ms, linea = self.ping_queue.get()
+        """Vacía la cola y emite una sola señal con todos los resultados pendientes."""
+        cola = self.ping_queue
+        lote = []
+        while cola:
+            ts, ms, linea = cola.popleft()
             if linea is not None:  # Ignorar líneas vacías
-                self.ping_signal.emit(ts, ms, linea)
+                lote.append((ts, ms, linea))
+        if lote:
+            self.ping_signal.emit(lote)
 
-    def process_ping_result(self, ts, ms, linea_limpia):
-        """Procesa el resultado de un ping (ejecutado en thread principal de Qt)."""
+    def process_ping_lote(self, lote):
+        """Procesa un lote de resultados (ejecutado en thread principal de Qt)."""
         if self.btn_pause.isChecked():
             return
 
-        self.historial.append((ts, ms, linea_limpia))
+        lineas = [self.process_ping_result(ts, ms, linea) for ts, ms, linea in lote]
+
+        # Consola: una sola actualización por lote; la gráfica se redibuja como
+        # máximo a ~30 Hz (varios lotes seguidos se agrupan en un solo redibujado)
+        self.update_console(lineas)
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+
+    def process_ping_result(self, ts, ms, linea_limpia):
+        """Registra un ping y retorna (hora, color, linea) para la consola."""
+        # Fecha/hora formateada una sola vez por ping: se reutiliza en el label
+        # de estado, la consola, el CSV, el historial y la etiqueta del eje X
+        hora = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
+
+        # Fila CSV formateada una sola vez: va al bloque en curso y queda en el
+        # historial para el guardado manual. Las comillas de la respuesta (p.ej.
+        # en el texto de una excepción) se duplican, como exige CSV
+        respuesta = linea_limpia.replace('"', '""')
+        fila = f"{hora},{ms if ms is not None else 'FAIL'},\"{respuesta}\"\n"
+        self.historial.append((ts, fila))
 
         # Contadores de paquetes
         self.paquetes_enviados += 1
@@ -412,9 +490,6 @@ class PingMonitor(QtWidgets.QMainWindow):
         else:
             self.paquetes_perdidos += 1
 
-        # hora
-        hora = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
-
         # color según alerta
         if ms is None or ms > TIEMPO_MAXIMO:
             color = COLOR_ALERTA
@@ -423,11 +498,15 @@ class PingMonitor(QtWidgets.QMainWindow):
 
         # Guardar latencia válida para estadísticas
         if ms is not None:
-            self.latencias_validas.append(ms)
+            self.lat_cuenta += 1
+            self.lat_suma += ms
+            if ms < self.lat_min:
+                self.lat_min = ms
+            if ms > self.lat_max:
+                self.lat_max = ms
 
         # registrar
-        self.tiempos.append(ts)
-        self.latencias.append(ms if ms is not None else 0)
+        self.agregar_muestra(ts, ms if ms is not None else np.nan, hora[-8:])
 
         # actualizar status label
         if ms is None:
@@ -435,50 +514,56 @@ class PingMonitor(QtWidgets.QMainWindow):
         else:
             self.status_label.setText(f"{hora} - {ms} ms")
 
-        # Actualizar gráfica y consola en cada ping
-        self.update_plot()
-        self.update_console()
-
-        # Guardar cada MAX_POINTS muestras
-        if len(self.historial) % MAX_POINTS == 0:
+        # Escribir la muestra en el CSV del bloque y cerrarlo cada MAX_POINTS muestras
+        self.escribir_muestra_csv(ts, fila)
+        if self._csv_filas >= MAX_POINTS:
             self.export_current_block()
+
+        return hora, color, linea_limpia
     
-    def update_console(self):
-        """Actualiza la consola con todo el historial y estadísticas."""
-        # Limpiar el contenido de la consola y redibujar todo
-        self.console.clear()
-        
-        # Mostrar todas las líneas del historial
-        for hist_ts, hist_ms, hist_linea in self.historial:
-            hist_hora = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(hist_ts))
-            
-            if hist_ms is None or hist_ms > TIEMPO_MAXIMO:
-                hist_color = COLOR_ALERTA
-            else:
-                hist_color = FG_COLOR
-            
-            self.console.append(
-                f'<span style="color:{hist_color}">{hist_hora} - {hist_linea}</span>'
-            )
-        
-        # Agregar línea de estadísticas al final
-        self.console.append(
-            f'<br><span style="color:{FG_COLOR}">──────────────────────────────────────</span>'
-        )
-        
+    def _formato(self, color):
+        """QTextCharFormat (en caché) con el color de texto dado."""
+        formato = self._formatos.get(color)
+        if formato is None:
+            formato = QTextCharFormat()
+            formato.setForeground(QColor(color))
+            self._formatos[color] = formato
+        return formato
+
+    def update_console(self, lineas):
+        """Agrega las líneas (hora, color, linea) a la consola y actualiza las estadísticas del final."""
+        cursor = self._console_cursor
+        cursor.beginEditBlock()
+
+        # Quitar el pie de estadísticas anterior (últimos bloques del documento),
+        # desde el final de la última línea del historial
+        cursor.movePosition(QTextCursor.End)
+        if self._bloques_pie:
+            cursor.movePosition(QTextCursor.PreviousBlock, QTextCursor.KeepAnchor, self._bloques_pie)
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+
+        # Agregar solo las nuevas líneas (sin redibujar el historial)
+        for hora, color, linea in lineas:
+            if not self.console.document().isEmpty():
+                cursor.insertBlock()
+            cursor.insertText(f"{hora} - {linea}", self._formato(color))
+
+        # Pie con estadísticas: línea vacía + separador + latencia + paquetes.
+        # Cada línea es una lista de fragmentos (texto, color)
+        pie = [[("──────────────────────────────────────", FG_COLOR)]]
+
         # Estadísticas de latencia
-        if self.latencias_validas:
-            minimo = min(self.latencias_validas)
-            maximo = max(self.latencias_validas)
-            media = sum(self.latencias_validas) / len(self.latencias_validas)
-            
-            self.console.append(
-                f'<span style="color:{FG_COLOR}">Latencia: Mínimo = {minimo}ms, Máximo = {maximo}ms, Media = {media:.1f}ms</span>'
-            )
-        
+        if self.lat_cuenta:
+            media = self.lat_suma / self.lat_cuenta
+
+            pie.append([
+                (f"Latencia: Mínimo = {self.lat_min}ms, Máximo = {self.lat_max}ms, Media = {media:.1f}ms", FG_COLOR)
+            ])
+
         # Estadísticas de paquetes
         porcentaje_perdida = (self.paquetes_perdidos / self.paquetes_enviados * 100) if self.paquetes_enviados > 0 else 0
-        
+
         # Color para porcentaje de pérdida
         if porcentaje_perdida == 0:
             color_perdida = FG_COLOR
@@ -486,16 +571,24 @@ class PingMonitor(QtWidgets.QMainWindow):
             color_perdida = "#FFFF00"  # Amarillo
         else:
             color_perdida = COLOR_ALERTA  # Rojo
-        
-        self.console.append(
-            f'<span style="color:{FG_COLOR}">Paquetes: Enviados = {self.paquetes_enviados}, Recibidos = {self.paquetes_recibidos}, Perdidos = {self.paquetes_perdidos} </span>'
-            f'<span style="color:{color_perdida}">({porcentaje_perdida:.1f}% pérdida)</span>'
-        )
 
-        # scroll automático al final
-        self.console.verticalScrollBar().setValue(
-            self.console.verticalScrollBar().maximum()
-        )
+        pie.append([
+            (f"Paquetes: Enviados = {self.paquetes_enviados}, Recibidos = {self.paquetes_recibidos}, Perdidos = {self.paquetes_perdidos} ", FG_COLOR),
+            (f"({porcentaje_perdida:.1f}% pérdida)", color_perdida),
+        ])
+
+        cursor.insertBlock()  # Línea vacía antes del separador
+        for fragmentos in pie:
+            cursor.insertBlock()
+            for texto, color in fragmentos:
+                cursor.insertText(texto, self._formato(color))
+        self._bloques_pie = len(pie) + 1
+
+        cursor.endEditBlock()
+
+        # scroll automático al final (una sola vez por lote)
+        scrollbar = self.console.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
 
     def guardar_manual(self):
         """Guarda manualmente el historial actual."""
@@ -510,12 +603,11 @@ class PingMonitor(QtWidgets.QMainWindow):
             fecha_inicio = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime(ts_inicio))
             fecha_fin = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime(ts_fin))
 
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            carpeta_ip = os.path.join(base_dir, "saves", self.ip)
-            os.makedirs(carpeta_ip, exist_ok=True)
+            carpeta_ip = self._carpeta_base / "saves" / self.ip
+            carpeta_ip.mkdir(parents=True, exist_ok=True)
 
             nombre_archivo = f"save_{self.ip}_{fecha_inicio}_a_{fecha_fin}.csv"
-            ruta_completa = os.path.join(carpeta_ip, nombre_archivo)
+            ruta_completa = carpeta_ip / nombre_archivo
 
             with open(ruta_completa, "w", encoding="utf-8") as f:
                 f.write(f"# Ping session (manual save)\n")
@@ -524,64 +616,92 @@ class PingMonitor(QtWidgets.QMainWindow):
                 f.write(f"# Fin: {fecha_fin}\n")
                 f.write("datetime,latencia_ms,respuesta\n")
 
-                for item in self.historial:
-                    if len(item) == 3:
-                        ts, ms, linea = item
-                    else:
-                        ts, ms = item
-                        linea = ""
-                    dt = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
-                    f.write(f"{dt},{ms if ms is not None else 'FAIL'},\"{linea}\"\n")
+                f.write("".join(fila for _, fila in self.historial))
 
             QMessageBox.information(self, "Guardado", f"Archivo guardado en:\n{ruta_completa}")
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"No se pudo guardar:\n{str(e)}")
 
-    def export_current_block(self):
-        """Guarda la sesión actual en un archivo y continúa."""
-        if not self.historial:
-            return
+    def _abrir_bloque_csv(self, ts):
+        """Abre el archivo CSV del bloque actual y escribe la cabecera."""
+        fecha_inicio = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime(ts))
 
-        ts_inicio = self.historial[0][0]
-        ts_fin = self.historial[-1][0]
+        # Mientras se escribe el bloque no se conoce la hora de fin: se usa un
+        # nombre provisional y se renombra al cerrar el bloque
+        self._csv_inicio = fecha_inicio
+        self._csv_ruta = self._carpeta_bloques / f"sesion_{self.ip}_{fecha_inicio}_en_curso.csv"
+        self._csv = open(self._csv_ruta, "w", encoding="utf-8", buffering=1 << 16)
 
-        fecha_inicio = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime(ts_inicio))
-        fecha_fin = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime(ts_fin))
+        self._csv.write(f"# Ping session\n")
+        self._csv.write(f"# IP: {self.ip}\n")
+        self._csv.write(f"# Inicio: {fecha_inicio}\n")
+        # "# Fin:" se reescribe en su lugar al cerrar (mismo largo que la fecha de inicio)
+        self._csv_pos_fin = self._csv.tell()
+        self._csv.write(f"# Fin: {fecha_inicio}\n")
+        self._csv.write("datetime,latencia_ms,respuesta\n")
 
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        carpeta_ip = os.path.join(base_dir, "pings", self.ip)
-        os.makedirs(carpeta_ip, exist_ok=True)
+        self._csv_filas = 0
 
-        nombre_archivo = f"sesion_{self.ip}_{fecha_inicio}_a_{fecha_fin}.csv"
-        ruta_completa = os.path.join(carpeta_ip, nombre_archivo)
+    def escribir_muestra_csv(self, ts, fila):
+        """Escribe una fila ya formateada en el CSV del bloque actual (abre el bloque si hace falta)."""
+        try:
+            if self._csv is None:
+                self._abrir_bloque_csv(ts)
+            self._csv.write(fila)
+            self._csv_filas += 1
+            self._csv_ts_fin = ts
+        except Exception as e:
+            print("Error al guardar archivo:", e)
+
+    def export_current_block(self):
+        """Cierra el CSV del bloque actual con su hora de fin; el siguiente ping abre uno nuevo."""
+        if self._csv is None:
+            return
+
+        fecha_fin = time.strftime("%Y-%m-%d_%H-%M-%S", time.localtime(self._csv_ts_fin))
+        nombre_archivo = f"sesion_{self.ip}_{self._csv_inicio}_a_{fecha_fin}.csv"
+        ruta_completa = self._carpeta_bloques / nombre_archivo
 
         try:
-            with open(ruta_completa, "w", encoding="utf-8") as f:
-                f.write(f"# Ping session\n")
-                f.write(f"# IP: {self.ip}\n")
-                f.write(f"# Inicio: {fecha_inicio}\n")
-                f.write(f"# Fin: {fecha_fin}\n")
-                f.write("datetime,latencia_ms,respuesta\n")
-                for ts, ms, linea in self.historial:
-                    dt = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
-                    f.write(f"{dt},{ms if ms is not None else 'FAIL'},\"{linea}\"\n")
+            self._csv.seek(self._csv_pos_fin)
+            self._csv.write(f"# Fin: {fecha_fin}\n")
+            self._csv.close()
+            os.replace(self._csv_ruta, ruta_completa)
 
             print(f"Bloque guardado: {ruta_completa}")
-            self.historial = []
         except Exception as e:
             print("Error al guardar archivo:", e)
+        finally:
+            self._csv = None
+
+    def agregar_muestra(self, ts, valor, etiqueta):
+        """Agrega una muestra a los buffers de la gráfica (conserva las últimas MAX_POINTS)."""
+        if self._fin == self._latencias.size:
+            # Buffer lleno: mover las últimas MAX_POINTS - 1 muestras al principio
+            conservar = MAX_POINTS - 1
+            self._latencias[:conservar] = self._latencias[self._fin - conservar:self._fin]
+            self._tiempos[:conservar] = self._tiempos[self._fin - conservar:self._fin]
+            self._etiquetas[:conservar] = self._etiquetas[self._fin - conservar:self._fin]
+            self._inicio = 0
+            self._fin = conservar
+
+        self._latencias[self._fin] = valor
+        self._tiempos[self._fin] = ts
+        self._etiquetas[self._fin] = etiqueta
+        self._fin += 1
+        if self._fin - self._inicio > MAX_POINTS:
+            self._inicio += 1
 
     def update_plot(self):
-        n = len(self.latencias)
-        y = list(self.latencias)
+        # Vistas (sin copia) de las muestras visibles
+        y = self._latencias[self._inicio:self._fin]
+        n = y.size
 
         # Curva azul
-        self.curve.setData(range(n), y)
+        self.curve.setData(self._x[:n], y)
 
         # Eje X con hora
-        x_labels = [time.strftime("%H:%M:%S", time.localtime(ts)) for ts in self.tiempos]
-
         vb = self.plot_widget.getViewBox()
         x_range = vb.viewRange()[0]
         num_visible_points = int(x_range[1] - x_range[0]) + 1
@@ -591,16 +711,30 @@ class PingMonitor(QtWidgets.QMainWindow):
 
         step = max(1, num_visible_points // 5)
 
-        ticks = [(i, label) for i, label in enumerate(x_labels) if i % step == 0]
-        self.plot_widget.getAxis('bottom').setTicks([ticks])
-
-        # Fallos: puntos rojos
-        puntos = [{'pos': (i, 0)} for i, v in enumerate(y) if v == 0]
-        self.scatter.setData([p['pos'][0] for p in puntos], [p['pos'][1] for p in puntos])
-
-        # Limitar vista
-        if n > 120:
-            self.plot_widget.setXRange(n - 120, n)
+        # Solo se leen las etiquetas ya formateadas de los puntos que son ticks.
+        # Mientras no cambien la primera muestra visible, el paso ni la cantidad
+        # de ticks, son las mismas y setTicks (que invalida el eje) no se llama
+        if n:
+            inicio = self._inicio
+            clave = (self._tiempos[inicio], step, (n + step - 1) // step)
+            if clave != self._clave_ticks:
+                self._clave_ticks = clave
+                etiquetas = self._etiquetas
+                ticks = [(i, etiquetas[inicio + i]) for i in range(0, n, step)]
+                self.plot_widget.getAxis('bottom').setTicks([ticks])
+
+        # Fallos: puntos rojos en y=0 (máscara vectorizada en lugar de recorrer en Python).
+        # Sin fallos visibles (el caso normal) el scatter ya está vacío y no se toca.
+        fallos = np.flatnonzero(np.isnan(y)).astype(np.float32)
+        if fallos.size or self._scatter_con_fallos:
+            self.scatter.setData(fallos, self._ceros[:fallos.size])
+            self._scatter_con_fallos = fallos.size > 0
+
+        # Limitar vista: solo si la ventana visible cambió (con el buffer lleno n
+        # ya no crece y el rango es el mismo; setXRange dispara un update del ViewBox)
+        if n > 120 and n != self._ultimo_fin_x:
+            self.plot_widget.setXRange(n - 120, n, padding=0)
+            self._ultimo_fin_x = n
 
     def toggle_pause(self, paused):
         if paused:
@@ -610,15 +744,24 @@ class PingMonitor(QtWidgets.QMainWindow):
             self.btn_pause.setText("Pausar")
 
     def clear(self):
-        self.latencias.clear()
-        self.tiempos.clear()
-        self.latencias_validas.clear()
+        self._inicio = 0
+        self._fin = 0
+        self.lat_min = float('inf')
+        self.lat_max = float('-inf')
+        self.lat_suma = 0.0
+        self.lat_cuenta = 0
         self.paquetes_enviados = 0
         self.paquetes_recibidos = 0
         self.paquetes_perdidos = 0
         self.curve.setData([], [])
         self.scatter.setData([], [])
+        self._scatter_con_fallos = False
+        self._clave_ticks = None
+        # Volver al rango X automático hasta tener de nuevo más de 120 puntos
+        self._ultimo_fin_x = -1
+        self.plot_widget.enableAutoRange(axis='x')
         self.console.clear()
+        self._bloques_pie = 0
         self.status_label.setText("Limpio")
     
     def closeEvent(self, event):
@@ -633,6 +776,7 @@ class PingMonitor(QtWidgets.QMainWindow):
 # Main
 # ---------------------------
 def main():
+    habilitar_ansi()
     while True:
         accion = menu_principal()
 
@@ -653,15 +797,20 @@ def main():
                 ip, nombre = elegir_guardada()
                 if not ip:
                     continue
+                # Direcciones guardadas antes de limitar el monitoreo a IPv4
+                if not validar_ip(ip):
+                    print(f"{ip} no es una dirección IPv4: no se puede monitorear.")
+                    continue
 
             elif opcion == "2":
                 ip = input("IP a monitorear: ").strip()
                 if not validar_ip(ip):
-                    print("IP inválida.")
+                    print("IP inválida (debe ser IPv4).")
                     continue
                 nombre = None  # No tiene nombre guardado
 
             # Iniciar monitor
+            configurar_opengl()
             app = QtWidgets.QApplication(sys.argv)
             win = PingMonitor(ip, nombre)
             sys.exit(app.exec_())
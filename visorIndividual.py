@@ -18,17 +18,22 @@ import sys
 import time
 from collections import deque
 from threading import Thread
-from queue import Queue
+from queue import Queue, Full
 import sqlite3
 import os
+import csv
 
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QTextCursor, QTextCharFormat, QColor
 from PyQt5.QtWidgets import QMessageBox
 import pyqtgraph as pg
+import numpy as np
 
-from netutils import ping_unico, preparar_bd_sqlite, guardar_ping, validar_ip, BatchPingSaver
+from netutils import (ping_unico, preparar_bd_sqlite, guardar_ping, validar_ip, BatchPingSaver,
+                      escritor_pings, encolar_ping, MAX_COLA_ESCRITURA)
 from mos_functions import calcular_mos, clasificar_mos
+from graficos import configurar_opengl
 
 # Configuración
 MAX_POINTS = 1800  # Puntos máximos en pantalla
@@ -38,6 +43,7 @@ COLOR_ALERTA = "#FF0000"
 FONT_SIZE = 10
 TIEMPO_MAXIMO = 100  # ms para considerar alerta
 VENTANA_MOS = 50  # Calcular MOS cada 50 muestras
+MAX_HISTORIAL = 100_000  # Muestras conservadas para exportar a CSV (~27 h a 1 ping/s)
 
 # Configuración de grabación optimizada
 BATCH_SIZE = 10  # Commits cada N pings (reduce latencia de I/O en ~90%)
@@ -46,20 +52,36 @@ BATCH_SIZE = 10  # Commits cada N pings (reduce latencia de I/O en ~90%)
 class PingThread(Thread):
     """Thread que hace pings continuos usando ping_unico()."""
 
-    def __init__(self, ip, queue, guardar_bd=True, batch_size=10):
+    def __init__(self, ip, emitir, emitir_error, guardar_bd=True, batch_size=10):
+        """
+        emitir: función que recibe (ts, fecha, ms) por cada ping; se usa el emit()
+        de una señal Qt con conexión encolada, así el resultado llega al thread de
+        la UI sin cola intermedia ni timer de sondeo.
+        emitir_error: función que recibe el mensaje de un error del ping o de la
+        grabación en BD, para mostrarlo en la UI (también una señal encolada).
+        """
         super().__init__(daemon=True)
         self.ip = ip
-        self.queue = queue
+        self.emitir = emitir
+        self.emitir_error = emitir_error
         self.running = True
         self.guardar_bd = guardar_bd
         self.conn = None
+        self.cola_bd = None
+        self.escritor = None
         self.batch_saver = None
 
         if self.guardar_bd:
             # Preparar conexión a BD con optimizaciones WAL
             self.conn = preparar_bd_sqlite(ip)
-            # Crear gestor de batch para commits optimizados
+            # Las escrituras (por lotes) las hace un thread aparte: el loop de
+            # pings solo encola el resultado y nunca espera al disco
             self.batch_saver = BatchPingSaver(self.conn, batch_size=batch_size)
+            self.cola_bd = Queue(maxsize=MAX_COLA_ESCRITURA)
+            self.escritor = Thread(target=escritor_pings,
+                                   args=(self.batch_saver, self.cola_bd, emitir_error), daemon=True)
+            self.escritor.start()
+        self._descartando = False  # Racha de pings descartados por cola de BD llena
 
     def run(self):
         """Loop principal de pings."""
@@ -70,34 +92,83 @@ class PingThread(Thread):
                 # Hacer ping usando nuestra función
                 resultado_ms = ping_unico(self.ip)
 
-                # Guardar en BD usando batch (NO bloquea con commit inmediato)
-                if self.guardar_bd and self.batch_saver:
-                    self.batch_saver.agregar_ping(resultado_ms)
+                # Fecha/hora del ping formateada una sola vez a partir de ts: la
+                # misma cadena va a la BD y a la UI (estado, consola y CSV)
+                fecha = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
 
-                # Enviar a la cola para UI
-                self.queue.put((ts, resultado_ms))
+                # Encolar para guardar en BD (el escritor hace commit por lotes)
+                if self.cola_bd is not None:
+                    if encolar_ping(self.cola_bd, fecha, resultado_ms):
+                        self._descartando = False
+                    elif not self._descartando:
+                        # Avisar una sola vez por racha de pings descartados
+                        self._descartando = True
+                        self.emitir_error("La grabación en BD no da abasto: se descartan pings")
+
+                # Enviar a la UI
+                self.emitir(ts, fecha, resultado_ms)
 
         except Exception as e:
-            self.queue.put((time.time(), None, f"ERROR: {str(e)}"))
+            self.emitir_error(f"Error en el thread de ping (monitoreo detenido): {e}")
         finally:
             # Guardar pings pendientes antes de cerrar
-            if self.batch_saver:
-                self.batch_saver.close()
+            self.detener_escritor()
             if self.conn:
+                self.conn.execute("PRAGMA optimize")
                 self.conn.close()
 
-    def stop(self):
-        """Detiene el thread y guarda datos pendientes."""
+    def detener_escritor(self, timeout=None):
+        """
+        Avisa al escritor que termine (guarda los pings pendientes) y lo espera
+        hasta timeout segundos (None = sin límite).
+
+        Returns:
+            True si el escritor terminó, False si sigue guardando (o trabado)
+        """
+        if self.escritor is None or not self.escritor.is_alive():
+            return True
+        try:
+            self.cola_bd.put(None, timeout=timeout)
+        except Full:
+            return False
+        self.escritor.join(timeout)
+        return not self.escritor.is_alive()
+
+    def stop(self, timeout=3.0):
+        """
+        Detiene el thread y guarda datos pendientes, esperando como máximo
+        timeout segundos para no congelar la ventana al cerrar.
+        """
         self.running = False
-        # Forzar guardado de datos pendientes
-        if self.batch_saver:
-            self.batch_saver.flush()
+        # Forzar guardado de datos pendientes: el thread de ping puede seguir
+        # esperando una respuesta y la app cerrar antes de que termine
+        if not self.detener_escritor(timeout):
+            # El escritor es daemon: lo que no llegó a guardar se pierde al salir
+            pendientes = self.cola_bd.qsize() + len(self.batch_saver.buffer)
+            print(f"Aviso: {pendientes} pings sin guardar en la BD "
+                  f"(el guardado no terminó en {timeout:g} s)")
 
 
 class VisorIndividual(QtWidgets.QMainWindow):
     """Ventana principal del visor."""
 
-    ping_signal = pyqtSignal(float, float)  # ts, ms
+    ping_signal = pyqtSignal(float, str, float)  # ts, fecha, ms
+    error_signal = pyqtSignal(str)  # Errores del thread de ping o de la grabación
+
+    # Hojas de estilo fijas por estado (se aplican solo cuando el estado cambia)
+    QSS_ESTADO_OK = "font-size: 14px; padding: 5px; color: green;"
+    QSS_ESTADO_ALTO = "font-size: 14px; padding: 5px; color: orange; font-weight: bold;"
+    QSS_ESTADO_TIMEOUT = "font-size: 14px; padding: 5px; color: red; font-weight: bold;"
+    QSS_PERDIDA_OK = "font-size: 12px; padding: 5px; background-color: #ccffcc; border-radius: 3px; color: green;"
+    QSS_PERDIDA_BAJA = "font-size: 12px; padding: 5px; background-color: #fff4cc; border-radius: 3px; color: orange;"
+    QSS_PERDIDA_ALTA = "font-size: 12px; padding: 5px; background-color: #ffcccc; border-radius: 3px; color: red; font-weight: bold;"
+    QSS_MOS_INICIAL = "font-size: 12px; padding: 5px; background-color: #e8f4f8; border-radius: 3px; font-weight: bold;"
+    QSS_MOS_SIN_DATOS = "font-size: 12px; padding: 5px; background-color: #f0f0f0; border-radius: 3px;"
+    QSS_MOS_EXCELENTE = "font-size: 12px; padding: 5px; background-color: #ccffcc; border-radius: 3px; font-weight: bold; color: green;"
+    QSS_MOS_BUENA = "font-size: 12px; padding: 5px; background-color: #e8f8e8; border-radius: 3px; font-weight: bold; color: darkgreen;"
+    QSS_MOS_ACEPTABLE = "font-size: 12px; padding: 5px; background-color: #fff8cc; border-radius: 3px; font-weight: bold; color: darkorange;"
+    QSS_MOS_POBRE = "font-size: 12px; padding: 5px; background-color: #ffe8cc; border-radius: 3px; font-weight: bold; color: orange;"
+    QSS_MOS_MALA = "font-size: 12px; padding: 5px; background-color: #ffcccc; border-radius: 3px; font-weight: bold; color: red;"
 
     def __init__(self, ip, guardar_bd=True):
         super().__init__()
@@ -108,41 +179,61 @@ class VisorIndividual(QtWidgets.QMainWindow):
         self.ip = ip
         self.guardar_bd = guardar_bd
 
-        # Datos para gráfica
-        self.latencias = deque(maxlen=MAX_POINTS)
-        self.tiempos = deque(maxlen=MAX_POINTS)
-
-        # Historial completo (para export)
-        self.historial = []
-
-        # Estadísticas
-        self.latencias_validas = []
+        # Datos para gráfica: buffers NumPy preasignados (el doble de MAX_POINTS).
+        # Las últimas MAX_POINTS muestras son siempre la vista contigua
+        # [_inicio:_fin]; al llegar al final del buffer se copian al principio
+        # (una copia cada MAX_POINTS pings, en lugar de list() en cada redibujado).
+        # Latencias en float32 (0 = timeout); timestamps en float64
+        self._latencias = np.zeros(2 * MAX_POINTS, dtype=np.float32)
+        self._tiempos = np.zeros(2 * MAX_POINTS, dtype=np.float64)
+        self._inicio = 0
+        self._fin = 0
+        self._x = np.arange(MAX_POINTS, dtype=np.float32)  # Eje X reutilizable
+        self._ceros = np.zeros(MAX_POINTS, dtype=np.float32)  # Y de los puntos de fallo
+        self._scatter_con_fallos = False  # El scatter tiene puntos dibujados
+        self._clave_ticks = None  # (primer ts, paso, cantidad) de los ticks aplicados
+
+        # Historial para export, acotado para que la memoria no crezca sin fin en 24/7
+        self.historial = deque(maxlen=MAX_HISTORIAL)
+
+        # Estadísticas (acumuladas, O(1) por ping)
+        self.lat_min = float('inf')
+        self.lat_max = float('-inf')
+        self.lat_suma = 0.0
+        self.lat_cuenta = 0
         self.paquetes_enviados = 0
         self.paquetes_recibidos = 0
         self.paquetes_perdidos = 0
 
-        # Ventana de 50 muestras para MOS
-        self.ventana_mos = deque(maxlen=VENTANA_MOS)  # [(latencia_ms, is_valida)]
+        # Ventana circular de las últimas 50 muestras para MOS, en arrays NumPy:
+        # latencia (0 si se perdió) y si el paquete fue válido
+        self._mos_ms = np.zeros(VENTANA_MOS, dtype=np.float64)
+        self._mos_valida = np.zeros(VENTANA_MOS, dtype=bool)
+        self._mos_pos = 0  # Próxima posición a escribir (la muestra más antigua)
+        self._mos_muestras = 0  # Muestras en la ventana (hasta VENTANA_MOS)
         self.mos_actual = None
         self.r_factor_actual = None
         self.latencia_efectiva_actual = None
         self.calidad_actual = None
 
-        # Queue y thread
-        self.ping_queue = Queue()
-        self.ping_thread = PingThread(self.ip, self.ping_queue, self.guardar_bd, batch_size=BATCH_SIZE)
+        # Thread de ping: emite ping_signal desde su propio thread
+        self.ping_thread = PingThread(self.ip, self.ping_signal.emit, self.error_signal.emit,
+                                      self.guardar_bd, batch_size=BATCH_SIZE)
 
         # UI
         self.init_ui()
 
-        # Conectar señal
-        self.ping_signal.connect(self.process_ping_result)
+        # Conectar señal (encolada: el slot corre en el thread de la UI)
+        self.ping_signal.connect(self.process_ping_result, Qt.QueuedConnection)
+        self.error_signal.connect(self.mostrar_error, Qt.QueuedConnection)
 
-        # Timer para revisar queue
-        self.queue_timer = QtCore.QTimer()
-        self.queue_timer.setInterval(50)
-        self.queue_timer.timeout.connect(self.check_queue)
-        self.queue_timer.start()
+        # Gráfica y estadísticas se refrescan desacopladas de la llegada de
+        # pings: como máximo 5 veces por segundo (varios pings se agrupan)
+        self._refresco_timer = QtCore.QTimer()
+        self._refresco_timer.setSingleShot(True)
+        self._refresco_timer.setInterval(200)
+        self._refresco_timer.timeout.connect(self.refrescar_ui)
+        self._refresco_pendiente = False  # Llegaron pings mientras estaba minimizada
 
         # Iniciar thread de ping
         self.ping_thread.start()
@@ -180,9 +271,16 @@ class VisorIndividual(QtWidgets.QMainWindow):
 
         # Línea azul para latencias
         self.curve = self.plot_widget.plot([], [], pen=pg.mkPen(color='#00CC96', width=2))
+        # Solo se dibuja lo visible (últimos 120 puntos), reducido por picos al
+        # ancho en píxeles: el costo de pintar no crece con MAX_POINTS
+        self.curve.setDownsampling(auto=True, method='peak')
+        self.curve.setClipToView(True)
+        # Qt conserva el dibujo rasterizado mientras el item no cambie
+        self.curve.setCacheMode(QtWidgets.QGraphicsItem.DeviceCoordinateCache)
 
         # Puntos rojos para fallos
         self.scatter = pg.ScatterPlotItem(size=10, brush=pg.mkBrush(255, 0, 0), symbol='x')
+        self.scatter.setCacheMode(QtWidgets.QGraphicsItem.DeviceCoordinateCache)
         self.plot_widget.addItem(self.scatter)
 
         # ===== ESTADÍSTICAS =====
@@ -203,7 +301,7 @@ class VisorIndividual(QtWidgets.QMainWindow):
         mos_layout = QtWidgets.QHBoxLayout()
 
         self.label_mos = QtWidgets.QLabel("MOS: -- (esperando 50 muestras)")
-        self.label_mos.setStyleSheet("font-size: 12px; padding: 5px; background-color: #e8f4f8; border-radius: 3px; font-weight: bold;")
+        self.aplicar_estilo(self.label_mos, self.QSS_MOS_INICIAL)
         mos_layout.addWidget(self.label_mos)
 
         self.label_jitter = QtWidgets.QLabel("Jitter: -- ms")
@@ -213,11 +311,19 @@ class VisorIndividual(QtWidgets.QMainWindow):
         layout.addLayout(mos_layout)
 
         # ===== CONSOLA =====
-        self.console = QtWidgets.QTextEdit()
+        # Texto plano con formato por color (sin parsear HTML en cada línea) y
+        # cantidad de líneas limitada para que la memoria no crezca sin fin en 24/7
+        self.console = QtWidgets.QPlainTextEdit()
         self.console.setReadOnly(True)
-        self.console.setFontFamily("Courier")
+        self.console.setMaximumBlockCount(500)
         self.console.setStyleSheet(f"background-color: {BG_COLOR}; color: {FG_COLOR};")
+        self._console_cursor = QTextCursor(self.console.document())
+        self._formato_normal = QTextCharFormat()
+        self._formato_normal.setForeground(QColor(FG_COLOR))
+        self._formato_alerta = QTextCharFormat()
+        self._formato_alerta.setForeground(QColor(COLOR_ALERTA))
         font = self.console.font()
+        font.setFamily("Courier")
         font.setPointSize(FONT_SIZE)
         self.console.setFont(font)
         self.console.setMaximumHeight(150)
@@ -257,19 +363,13 @@ class VisorIndividual(QtWidgets.QMainWindow):
 
         self.show()
 
-    def check_queue(self):
-        """Revisa la cola y procesa resultados."""
-        while not self.ping_queue.empty():
-            ts, ms = self.ping_queue.get()
-            self.ping_signal.emit(ts, ms)
-
-    def process_ping_result(self, ts, ms):
-        """Procesa un resultado de ping."""
+    def process_ping_result(self, ts, fecha, ms):
+        """Procesa un resultado de ping (fecha ya formateada por el PingThread)."""
         if self.btn_pause.isChecked():
             return
 
         # Agregar al historial
-        self.historial.append((ts, ms))
+        self.historial.append((ts, fecha, ms))
 
         # Contadores
         self.paquetes_enviados += 1
@@ -277,142 +377,210 @@ class VisorIndividual(QtWidgets.QMainWindow):
             self.paquetes_perdidos += 1
             ms_display = 0  # Para gráfica
             # Agregar a ventana MOS (paquete perdido)
-            self.ventana_mos.append((0, False))
+            self.agregar_muestra_mos(0, False)
         else:
             self.paquetes_recibidos += 1
-            self.latencias_validas.append(ms)
+            self.lat_cuenta += 1
+            self.lat_suma += ms
+            if ms < self.lat_min:
+                self.lat_min = ms
+            if ms > self.lat_max:
+                self.lat_max = ms
             ms_display = ms
             # Agregar a ventana MOS (paquete válido)
-            self.ventana_mos.append((ms, True))
+            self.agregar_muestra_mos(ms, True)
 
         # Agregar a gráfica
-        self.tiempos.append(ts)
-        self.latencias.append(ms_display)
+        self.agregar_muestra(ts, ms_display)
 
         # Calcular MOS cuando la ventana se llena por primera vez, y luego cada 10 muestras
-        if len(self.ventana_mos) == VENTANA_MOS:
+        if self._mos_muestras == VENTANA_MOS:
             if self.paquetes_enviados == VENTANA_MOS or self.paquetes_enviados % 10 == 0:
                 self.calcular_y_actualizar_mos()
 
         # Actualizar UI
-        self.update_status(ts, ms)
+        self.update_status(fecha, ms)
+        if not self._refresco_timer.isActive():
+            self._refresco_timer.start()
+        self.update_console(fecha, ms)
+
+    def refrescar_ui(self):
+        """Refresca estadísticas y gráfica con todos los pings recibidos desde el último refresco."""
+        # Minimizada no se ve nada: se refresca una sola vez al restaurar
+        if self.isMinimized():
+            self._refresco_pendiente = True
+            return
+        self._refresco_pendiente = False
         self.update_stats()
         self.update_plot()
-        self.update_console(ts, ms)
 
-    def update_status(self, ts, ms):
+    def changeEvent(self, event):
+        """Al restaurar la ventana aplica los pings llegados mientras estaba minimizada."""
+        if (event.type() == QtCore.QEvent.WindowStateChange
+                and self._refresco_pendiente and not self.isMinimized()):
+            self.refrescar_ui()
+        super().changeEvent(event)
+
+    def update_status(self, fecha, ms):
         """Actualiza el label de estado."""
-        hora = time.strftime('%H:%M:%S', time.localtime(ts))
+        hora = fecha[-8:]  # HH:MM:SS
 
         if ms == -1:
             self.status_label.setText(f"🔴 {hora} - TIMEOUT")
-            self.status_label.setStyleSheet("font-size: 14px; padding: 5px; color: red; font-weight: bold;")
+            self.aplicar_estilo(self.status_label, self.QSS_ESTADO_TIMEOUT)
         elif ms > TIEMPO_MAXIMO:
             self.status_label.setText(f"🟡 {hora} - {ms:.1f} ms (ALTO)")
-            self.status_label.setStyleSheet("font-size: 14px; padding: 5px; color: orange; font-weight: bold;")
+            self.aplicar_estilo(self.status_label, self.QSS_ESTADO_ALTO)
         else:
             self.status_label.setText(f"🟢 {hora} - {ms:.1f} ms")
-            self.status_label.setStyleSheet("font-size: 14px; padding: 5px; color: green;")
+            self.aplicar_estilo(self.status_label, self.QSS_ESTADO_OK)
+
+    def aplicar_estilo(self, label, qss):
+        """Aplica la hoja de estilo solo si cambió (Qt la re-parsea en cada setStyleSheet)."""
+        if label.property("qss_actual") != qss:
+            label.setStyleSheet(qss)
+            label.setProperty("qss_actual", qss)
 
     def update_stats(self):
         """Actualiza las estadísticas."""
         self.label_total.setText(f"Total: {self.paquetes_enviados}")
 
-        if self.latencias_validas:
-            promedio = sum(self.latencias_validas) / len(self.latencias_validas)
-            minimo = min(self.latencias_validas)
-            maximo = max(self.latencias_validas)
+        if self.lat_cuenta:
+            promedio = self.lat_suma / self.lat_cuenta
 
             self.label_promedio.setText(f"Promedio: {promedio:.1f} ms")
-            self.label_minmax.setText(f"Min/Max: {minimo:.1f}/{maximo:.1f} ms")
+            self.label_minmax.setText(f"Min/Max: {self.lat_min:.1f}/{self.lat_max:.1f} ms")
 
         if self.paquetes_enviados > 0:
             perdida = (self.paquetes_perdidos / self.paquetes_enviados) * 100
             self.label_perdida.setText(f"Pérdida: {perdida:.1f}%")
 
             if perdida > 5:
-                self.label_perdida.setStyleSheet("font-size: 12px; padding: 5px; background-color: #ffcccc; border-radius: 3px; color: red; font-weight: bold;")
+                self.aplicar_estilo(self.label_perdida, self.QSS_PERDIDA_ALTA)
             elif perdida > 0:
-                self.label_perdida.setStyleSheet("font-size: 12px; padding: 5px; background-color: #fff4cc; border-radius: 3px; color: orange;")
+                self.aplicar_estilo(self.label_perdida, self.QSS_PERDIDA_BAJA)
             else:
-                self.label_perdida.setStyleSheet("font-size: 12px; padding: 5px; background-color: #ccffcc; border-radius: 3px; color: green;")
+                self.aplicar_estilo(self.label_perdida, self.QSS_PERDIDA_OK)
+
+    def agregar_muestra(self, ts, valor):
+        """Agrega una muestra a los buffers de la gráfica (conserva las últimas MAX_POINTS)."""
+        if self._fin == self._latencias.size:
+            # Buffer lleno: mover las últimas MAX_POINTS - 1 muestras al principio
+            conservar = MAX_POINTS - 1
+            self._latencias[:conservar] = self._latencias[self._fin - conservar:self._fin]
+            self._tiempos[:conservar] = self._tiempos[self._fin - conservar:self._fin]
+            self._inicio = 0
+            self._fin = conservar
+
+        self._latencias[self._fin] = valor
+        self._tiempos[self._fin] = ts
+        self._fin += 1
+        if self._fin - self._inicio > MAX_POINTS:
+            self._inicio += 1
 
     def update_plot(self):
         """Actualiza la gráfica."""
-        n = len(self.latencias)
-        y = list(self.latencias)
+        # Vistas (sin copia) de las muestras visibles
+        y = self._latencias[self._inicio:self._fin]
+        n = y.size
+        x = self._x[:n]
 
         # Actualizar curva
-        self.curve.setData(range(n), y)
+        self.curve.setData(x, y)
 
-        # Puntos rojos para fallos
-        fallos = [(i, 0) for i, val in enumerate(y) if val == 0]
-        if fallos:
-            x_fallos, y_fallos = zip(*fallos)
-            self.scatter.setData(x_fallos, y_fallos)
-        else:
-            self.scatter.setData([], [])
+        # Puntos rojos para fallos (índices en una sola pasada en C). Sin fallos
+        # visibles (el caso normal) el scatter ya está vacío y no se toca
+        fallos = np.flatnonzero(y == 0).astype(np.float32)
+        if fallos.size or self._scatter_con_fallos:
+            self.scatter.setData(fallos, self._ceros[:fallos.size])
+            self._scatter_con_fallos = fallos.size > 0
 
         # Ajustar vista para mostrar últimos 120 puntos
         if n > 120:
             self.plot_widget.setXRange(n - 120, n)
 
-        # Etiquetas del eje X
-        if self.tiempos:
-            x_labels = [time.strftime("%H:%M:%S", time.localtime(ts)) for ts in self.tiempos]
+        # Etiquetas del eje X: solo se formatean las posiciones que son ticks.
+        # Mientras no cambien la primera muestra visible, el paso ni la cantidad
+        # de ticks (hasta llenar la ventana) las etiquetas son las mismas
+        if n:
             step = max(1, n // 10)
-            ticks = [(i, label) for i, label in enumerate(x_labels) if i % step == 0]
-            self.plot_widget.getAxis('bottom').setTicks([ticks])
-
-    def update_console(self, ts, ms):
+            clave = (self._tiempos[self._inicio], step, (n + step - 1) // step)
+            if clave != self._clave_ticks:
+                self._clave_ticks = clave
+                tiempos = self._tiempos[self._inicio:self._fin:step].tolist()
+                ticks = [
+                    (i * step, time.strftime("%H:%M:%S", time.localtime(ts)))
+                    for i, ts in enumerate(tiempos)
+                ]
+                self.plot_widget.getAxis('bottom').setTicks([ticks])
+
+    def update_console(self, hora, ms):
         """Actualiza la consola."""
-        hora = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
 
         if ms == -1:
-            color = COLOR_ALERTA
+            formato = self._formato_alerta
             texto = f"{hora} - TIMEOUT"
         elif ms > TIEMPO_MAXIMO:
-            color = COLOR_ALERTA
+            formato = self._formato_alerta
             texto = f"{hora} - {ms:.1f} ms (ALTO)"
         else:
-            color = FG_COLOR
+            formato = self._formato_normal
             texto = f"{hora} - {ms:.1f} ms"
 
-        self.console.append(f'<span style="color:{color}">{texto}</span>')
+        self.agregar_linea_consola(texto, formato)
+
+    def agregar_linea_consola(self, texto, formato):
+        """Agrega una línea al final de la consola y hace auto-scroll."""
+        cursor = self._console_cursor
+        cursor.movePosition(QTextCursor.End)
+        if not self.console.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertText(texto, formato)
 
         # Auto-scroll
         self.console.verticalScrollBar().setValue(
             self.console.verticalScrollBar().maximum()
         )
 
+    def mostrar_error(self, mensaje):
+        """Muestra en el estado y en la consola un error del thread de ping o de la grabación."""
+        fecha = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.status_label.setText(f"⚠️ {fecha[-8:]} - {mensaje}")
+        self.aplicar_estilo(self.status_label, self.QSS_ESTADO_TIMEOUT)
+        self.agregar_linea_consola(f"{fecha} - {mensaje}", self._formato_alerta)
+
+    def agregar_muestra_mos(self, ms, valida):
+        """Agrega una muestra a la ventana circular de MOS (pisa la más antigua)."""
+        self._mos_ms[self._mos_pos] = ms
+        self._mos_valida[self._mos_pos] = valida
+        self._mos_pos = (self._mos_pos + 1) % VENTANA_MOS
+        if self._mos_muestras < VENTANA_MOS:
+            self._mos_muestras += 1
+
     def calcular_y_actualizar_mos(self):
         """Calcula el MOS a partir de la ventana de 50 muestras."""
-        if len(self.ventana_mos) < VENTANA_MOS:
+        if self._mos_muestras < VENTANA_MOS:
             return  # No hay suficientes muestras aún
 
-        # Separar latencias válidas y contar pérdidas
-        latencias_validas = [lat for lat, valida in self.ventana_mos if valida]
-        paquetes_perdidos = sum(1 for _, valida in self.ventana_mos if not valida)
+        # Ventana en orden cronológico (la más antigua está en _mos_pos) y
+        # separación de latencias válidas / pérdidas con una máscara
+        valida = np.roll(self._mos_valida, -self._mos_pos)
+        latencias_validas = np.roll(self._mos_ms, -self._mos_pos)[valida]
+        paquetes_perdidos = VENTANA_MOS - latencias_validas.size
         perdida_porcentaje = (paquetes_perdidos / VENTANA_MOS) * 100
 
         # Necesitamos al menos algunas muestras válidas para calcular MOS
-        if len(latencias_validas) < 5:
+        if latencias_validas.size < 5:
             self.mos_actual = None
             self.calidad_actual = "Insuficientes datos"
             return
 
         # Calcular latencia promedio
-        latencia_promedio = sum(latencias_validas) / len(latencias_validas)
-
-        # Calcular jitter (método PingPlotter: promedio de diferencias absolutas)
-        if len(latencias_validas) >= 2:
-            diferencias = [
-                abs(latencias_validas[i+1] - latencias_validas[i])
-                for i in range(len(latencias_validas) - 1)
-            ]
-            jitter = sum(diferencias) / len(diferencias)
-        else:
-            jitter = 0
+        latencia_promedio = float(latencias_validas.mean())
+
+        # Calcular jitter (método PingPlotter: promedio de diferencias absolutas
+        # entre muestras válidas consecutivas)
+        jitter = float(np.abs(np.diff(latencias_validas)).mean())
 
         # Calcular MOS
         self.mos_actual, self.r_factor_actual, self.latencia_efectiva_actual = calcular_mos(
@@ -427,32 +595,23 @@ class VisorIndividual(QtWidgets.QMainWindow):
         """Actualiza los labels de MOS con el último cálculo."""
         if self.mos_actual is None:
             self.label_mos.setText("MOS: -- (insuficientes datos)")
-            self.label_mos.setStyleSheet("font-size: 12px; padding: 5px; background-color: #f0f0f0; border-radius: 3px;")
+            self.aplicar_estilo(self.label_mos, self.QSS_MOS_SIN_DATOS)
         else:
             texto_mos = f"MOS: {self.mos_actual:.2f} ({self.calidad_actual})"
             self.label_mos.setText(texto_mos)
 
             # Color según calidad
-            if self.mos_actual >= 4.3:  # Excelente
-                color_fondo = "#ccffcc"
-                color_texto = "green"
-            elif self.mos_actual >= 4.0:  # Buena
-                color_fondo = "#e8f8e8"
-                color_texto = "darkgreen"
-            elif self.mos_actual >= 3.6:  # Aceptable
-                color_fondo = "#fff8cc"
-                color_texto = "darkorange"
-            elif self.mos_actual >= 3.1:  # Pobre
-                color_fondo = "#ffe8cc"
-                color_texto = "orange"
-            else:  # Mala
-                color_fondo = "#ffcccc"
-                color_texto = "red"
-
-            self.label_mos.setStyleSheet(
-                f"font-size: 12px; padding: 5px; background-color: {color_fondo}; "
-                f"border-radius: 3px; font-weight: bold; color: {color_texto};"
-            )
+            if self.mos_actual >= 4.3:
+                qss = self.QSS_MOS_EXCELENTE
+            elif self.mos_actual >= 4.0:
+                qss = self.QSS_MOS_BUENA
+            elif self.mos_actual >= 3.6:
+                qss = self.QSS_MOS_ACEPTABLE
+            elif self.mos_actual >= 3.1:
+                qss = self.QSS_MOS_POBRE
+            else:
+                qss = self.QSS_MOS_MALA
+            self.aplicar_estilo(self.label_mos, qss)
 
         # Actualizar jitter
         self.label_jitter.setText(f"Jitter: {jitter:.2f} ms")
@@ -474,16 +633,20 @@ class VisorIndividual(QtWidgets.QMainWindow):
 
     def clear(self):
         """Limpia datos."""
-        self.latencias.clear()
-        self.tiempos.clear()
-        self.latencias_validas.clear()
+        self._inicio = 0
+        self._fin = 0
+        self.lat_min = float('inf')
+        self.lat_max = float('-inf')
+        self.lat_suma = 0.0
+        self.lat_cuenta = 0
         self.paquetes_enviados = 0
         self.paquetes_recibidos = 0
         self.paquetes_perdidos = 0
         self.historial.clear()
 
         # Limpiar ventana MOS
-        self.ventana_mos.clear()
+        self._mos_pos = 0
+        self._mos_muestras = 0
         self.mos_actual = None
         self.r_factor_actual = None
         self.latencia_efectiva_actual = None
@@ -491,11 +654,12 @@ class VisorIndividual(QtWidgets.QMainWindow):
 
         self.curve.setData([], [])
         self.scatter.setData([], [])
+        self._scatter_con_fallos = False
         self.console.clear()
 
         self.update_stats()
         self.label_mos.setText("MOS: -- (esperando 50 muestras)")
-        self.label_mos.setStyleSheet("font-size: 12px; padding: 5px; background-color: #e8f4f8; border-radius: 3px; font-weight: bold;")
+        self.aplicar_estilo(self.label_mos, self.QSS_MOS_INICIAL)
         self.label_jitter.setText("Jitter: -- ms")
         self.status_label.setText("Limpiado")
 
@@ -518,15 +682,17 @@ class VisorIndividual(QtWidgets.QMainWindow):
             nombre = f"export_{self.ip}_{fecha_inicio}_a_{fecha_fin}.csv"
             ruta = os.path.join(carpeta, nombre)
 
-            with open(ruta, "w", encoding="utf-8") as f:
+            with open(ruta, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
                 f.write(f"# IP: {self.ip}\n")
                 f.write(f"# Inicio: {fecha_inicio}\n")
                 f.write(f"# Fin: {fecha_fin}\n")
-                f.write("timestamp,latencia_ms\n")
 
-                for ts, ms in self.historial:
-                    dt = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
-                    f.write(f"{dt},{ms if ms != -1 else 'TIMEOUT'}\n")
+                # Filas con la fecha ya formateada al llegar cada ping (sin strftime por fila)
+                writer = csv.writer(f, lineterminator="\n")
+                writer.writerow(("timestamp", "latencia_ms"))
+                writer.writerows(
+                    (fecha, ms if ms != -1 else "TIMEOUT") for _, fecha, ms in self.historial
+                )
 
             QMessageBox.information(self, "Exportado", f"Archivo guardado en:\n{ruta}")
 
@@ -535,7 +701,7 @@ class VisorIndividual(QtWidgets.QMainWindow):
 
     def closeEvent(self, event):
         """Evento al cerrar la ventana."""
-        # ping_thread.stop() llama a batch_saver.flush() para guardar datos pendientes
+        # ping_thread.stop() espera al escritor (con límite) para guardar datos pendientes
         self.ping_thread.stop()
         event.accept()
 
@@ -560,6 +726,7 @@ def main():
     opcion = input("Opción [1]: ").strip() or "1"
     guardar_bd = (opcion == "1")
 
+    configurar_opengl()
     app = QtWidgets.QApplication(sys.argv)
     visor = VisorIndividual(ip, guardar_bd)
     sys.exit(app.exec_())